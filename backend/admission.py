@@ -0,0 +1,76 @@
+from contextlib import asynccontextmanager, contextmanager
+import asyncio
+import logging
+import threading
+
+from config import ADMISSION_RETRY_AFTER, ADMISSION_TIMEOUT, MAX_CONCURRENT_FETCHES
+from rates import InvalidRequest
+
+logger = logging.getLogger(__name__)
+
+
+def overloaded():
+    """Build the 503 returned when no fetch slot frees up in time."""
+    return InvalidRequest(
+        'Service overloaded',
+        'Too many requests are fetching rates right now; retry shortly',
+        status=503,
+        headers={'Retry-After': str(ADMISSION_RETRY_AFTER)}
+    )
+
+
+class Admission:
+    """
+    Bound the number of requests fetching from upstream at once.
+
+    Requests served entirely from cache never take a slot. A request that
+    needs upstream data waits up to ADMISSION_TIMEOUT seconds for one and
+    is otherwise turned away with 503 and Retry-After, instead of queueing
+    behind every other fetch.
+    """
+
+    def __init__(self, limit=MAX_CONCURRENT_FETCHES, timeout=ADMISSION_TIMEOUT):
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            logger.warning("Rejecting request: no upstream fetch slot available")
+            raise overloaded()
+
+    def release(self):
+        self._slots.release()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class AsyncAdmission:
+    """Asyncio counterpart of Admission, for one event loop."""
+
+    def __init__(self, limit=MAX_CONCURRENT_FETCHES, timeout=ADMISSION_TIMEOUT):
+        self.timeout = timeout
+        self._slots = asyncio.BoundedSemaphore(limit)
+
+    async def acquire(self):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Rejecting request: no upstream fetch slot available")
+            raise overloaded()
+
+    def release(self):
+        self._slots.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
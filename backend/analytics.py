@@ -0,0 +1,284 @@
+import math
+
+import numpy as np
+
+from formats import pair_header, pivot
+from series import ordinals_to_strings
+
+# Trading days per year, used to annualize daily log-return volatility
+TRADING_DAYS = 252
+
+
+def point(series, position):
+    """Return one observation as a {date, rate} dict."""
+    return {
+        'date': ordinals_to_strings(series.days[position:position + 1])[0],
+        'rate': float(series.rates[position])
+    }
+
+
+def summarize(series):
+    """
+    Compute summary statistics for one series.
+
+    Every statistic is a whole-array numpy reduction over the series.
+    Statistics that need more observations than the series has are None.
+
+    Returns:
+        Dict of mean, stdev, min, max, first, last, change, change_pct,
+        volatility (stdev of daily log returns) and annualized_volatility
+    """
+    rates = series.rates
+    count = len(rates)
+
+    stats = {
+        'mean': None,
+        'stdev': None,
+        'min': None,
+        'max': None,
+        'first': None,
+        'last': None,
+        'change': None,
+        'change_pct': None,
+        'volatility': None,
+        'annualized_volatility': None
+    }
+    if count == 0:
+        return stats
+
+    first = float(rates[0])
+    last = float(rates[-1])
+
+    stats.update(
+        mean=float(rates.mean()),
+        min=point(series, int(rates.argmin())),
+        max=point(series, int(rates.argmax())),
+        first=point(series, 0),
+        last=point(series, count - 1),
+        change=last - first,
+        change_pct=(last - first) / first * 100 if first else None
+    )
+
+    if count > 1:
+        stats['stdev'] = float(rates.std(ddof=1))
+
+    if count > 2:
+        log_returns = np.diff(np.log(rates))
+        volatility = float(log_returns.std(ddof=1))
+        stats['volatility'] = volatility
+        stats['annualized_volatility'] = volatility * math.sqrt(TRADING_DAYS)
+
+    return stats
+
+
+def stats_format(entries):
+    """
+    Per-pair summary statistics in place of the raw series.
+
+    Returns:
+        Tuple of (results, extra top-level response fields)
+    """
+    results = []
+    for pair_request, series in entries:
+        result = pair_header(pair_request, series)
+        result.update(summarize(series))
+        results.append(result)
+    return results, {}
+
+
+ROLLING_INDICATORS = ('sma', 'ema', 'std', 'bollinger')
+
+# Smallest decay factor a single EMA chunk may reach; keeps the closed form
+# below well inside float64 range and precision
+EMA_MIN_DECAY = 1e-12
+
+
+def nullable(values):
+    """Convert a float array to a list with None in place of NaN."""
+    values = values.astype(object)
+    values[np.isnan(values.astype(np.float64))] = None
+    return values.tolist()
+
+
+def rolling_mean(rates, window):
+    """
+    Simple moving average from one cumulative sum; NaN until the window fills.
+
+    The sum runs over the series centred on its mean to keep the running
+    total small.
+    """
+    sma = np.full(len(rates), np.nan)
+    if len(rates) >= window:
+        offset = rates.mean()
+        sums = np.cumsum(np.concatenate(([0.0], rates - offset)))
+        sma[window - 1:] = (sums[window:] - sums[:-window]) / window + offset
+    return sma
+
+
+def rolling_std(rates, window):
+    """
+    Rolling population standard deviation from cumulative sums.
+
+    The series is centred on its mean first so the sum-of-squares
+    difference does not lose precision to cancellation.
+    """
+    std = np.full(len(rates), np.nan)
+    if len(rates) >= window:
+        centred = rates - rates.mean()
+        sums = np.cumsum(np.concatenate(([0.0], centred)))
+        squares = np.cumsum(np.concatenate(([0.0], centred * centred)))
+        mean = (sums[window:] - sums[:-window]) / window
+        variance = (squares[window:] - squares[:-window]) / window - mean * mean
+        std[window - 1:] = np.sqrt(np.maximum(variance, 0.0))
+    return std
+
+
+def exponential_mean(rates, window):
+    """
+    Exponential moving average with alpha = 2 / (window + 1), seeded with the
+    first rate; NaN until the window fills.
+
+    Uses the closed form e[k] = d^(k+1) * (e[-1] + alpha * sum(x[i] / d^(i+1)))
+    with d = 1 - alpha, evaluated with a cumulative sum over chunks short
+    enough that d^chunk stays above EMA_MIN_DECAY.
+    """
+    count = len(rates)
+    ema = np.full(count, np.nan)
+    if count < window:
+        return ema
+
+    alpha = 2.0 / (window + 1)
+    decay = 1.0 - alpha
+    chunk = max(1, int(math.log(EMA_MIN_DECAY) / math.log(decay)))
+
+    previous = rates[0]
+    for start in range(0, count, chunk):
+        piece = rates[start:start + chunk]
+        powers = decay ** np.arange(1, len(piece) + 1)
+        ema[start:start + len(piece)] = powers * (previous + alpha * np.cumsum(piece / powers))
+        previous = ema[start + len(piece) - 1]
+
+    ema[:window - 1] = np.nan
+    return ema
+
+
+def rolling_indicators(rates, window, indicators, num_std):
+    """Compute the requested indicators for one window size."""
+    result = {'window': window}
+    sma = std = None
+
+    if 'sma' in indicators or 'bollinger' in indicators:
+        sma = rolling_mean(rates, window)
+    if 'std' in indicators or 'bollinger' in indicators:
+        std = rolling_std(rates, window)
+
+    if 'sma' in indicators:
+        result['sma'] = nullable(sma)
+    if 'ema' in indicators:
+        result['ema'] = nullable(exponential_mean(rates, window))
+    if 'std' in indicators:
+        result['std'] = nullable(std)
+    if 'bollinger' in indicators:
+        result['upper'] = nullable(sma + num_std * std)
+        result['lower'] = nullable(sma - num_std * std)
+
+    return result
+
+
+def rolling_format(windows, indicators, num_std):
+    """
+    Build a formatter returning each pair's rates with rolling indicators.
+
+    Each result carries parallel "dates" and "rates" arrays and one
+    "windows" entry per window size with an array per indicator, aligned to
+    the dates and null until the window has filled.
+
+    Returns:
+        Callable taking (pair_request, series) entries and returning
+        (results, extra top-level response fields)
+    """
+    def formatter(entries):
+        results = []
+        for pair_request, series in entries:
+            result = pair_header(pair_request, series)
+            result['dates'] = series.date_strings()
+            result['rates'] = series.rates
+            result['windows'] = [
+                rolling_indicators(series.rates, window, indicators, num_std)
+                for window in windows
+            ]
+            results.append(result)
+        return results, {'indicators': list(indicators), 'num_std': num_std}
+
+    return formatter
+
+
+# Fewest overlapping returns a correlation is reported for
+MIN_CORRELATION_OBSERVATIONS = 3
+
+
+def log_returns(matrix):
+    """
+    Daily log returns of every column of a date-aligned rate matrix.
+
+    A return is only defined between consecutive dates on which the column
+    has a rate; returns touching a missing day are NaN.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.diff(np.log(matrix), axis=0)
+
+
+def correlation_matrix(returns):
+    """
+    Pairwise-complete Pearson correlation of every pair of columns.
+
+    Each pair of columns is correlated over the rows where both have a
+    return. All pairs are computed at once with masked matrix products: for
+    columns i and j, n[i, j] counts shared rows and sums[i, j] sums column i
+    over them.
+
+    Returns:
+        Tuple of (correlation, observations) N x N arrays, with NaN where a
+        pair shares fewer than MIN_CORRELATION_OBSERVATIONS returns or a
+        column is constant
+    """
+    present = ~np.isnan(returns)
+    mask = present.astype(np.float64)
+    values = np.where(present, returns, 0.0)
+
+    observations = mask.T @ mask
+    sums = values.T @ mask
+    squares = (values * values).T @ mask
+    products = values.T @ values
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = products - sums * sums.T / observations
+        variance = squares - sums * sums / observations
+        correlation = covariance / np.sqrt(variance * variance.T)
+
+    invalid = (observations < MIN_CORRELATION_OBSERVATIONS) | ~(variance > 0) | ~(variance.T > 0)
+    correlation[invalid] = np.nan
+
+    return np.clip(correlation, -1.0, 1.0), observations.astype(np.int64)
+
+
+def correlation_format(entries):
+    """
+    Correlation of daily log returns across every pair in the batch.
+
+    Series are aligned on the union of their dates first; columns are
+    labelled as in the wide shape.
+
+    Returns:
+        Tuple of (results, extra top-level response fields)
+    """
+    results = [pair_header(pair_request, series) for pair_request, series in entries]
+
+    _, labels, matrix = pivot(entries)
+    correlation, observations = correlation_matrix(log_returns(matrix))
+
+    return results, {
+        'columns': labels,
+        'correlation': [nullable(row) for row in correlation],
+        'observations': observations.tolist()
+    }
@@ -1,9 +1,28 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 import logging
 
+from admission import Admission
+from analytics import correlation_format, rolling_format, stats_format
+from compression import compress_body
+from config import UPSTREAM_MAX_WORKERS
+from currencies import currency_registry
+from encoding import dumps, loads
+from planner import upstream_request
+from rates import (
+    InvalidRequest,
+    RatesBatch,
+    get_pairs,
+    parse_options,
+    parse_rolling_options,
+    parse_stream_options,
+)
+from upstream import fetch_json, prewarm
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -11,12 +30,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+class EncodingJSONProvider(JSONProvider):
+    """Route jsonify and request parsing through the configured encoder."""
+    
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype='application/json')
+
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = EncodingJSONProvider(app)
 CORS(app)  # Enable CORS for frontend access
 
-# Base URL for the Frankfurt Exchange Rates API
-FRANKFURT_API_URL = "https://api.frankfurter.app"
+# Bounded worker pool used to fan out pair fetches concurrently
+fetch_executor = ThreadPoolExecutor(
+    max_workers=UPSTREAM_MAX_WORKERS,
+    thread_name_prefix='frankfurter'
+)
+
+# Caps how many requests in this worker fetch from upstream at once
+admission = Admission()
+
+# Open upstream connections before the first request reaches this worker
+prewarm()
 
 
 @app.route('/health', methods=['GET'])
@@ -29,6 +73,81 @@ def health_check():
     }), 200
 
 
+@app.route('/api/currencies', methods=['GET'])
+def get_currencies():
+    """
+    List the currencies accepted by the rates endpoints.
+    
+    The list comes from Frankfurter's /currencies endpoint and is cached
+    in memory and on disk.
+    
+    Returns:
+        JSON response with a {code: name} "currencies" mapping sorted by code
+    
+    Status Codes:
+        200: Success
+        500: Internal server error
+    """
+    try:
+        currencies = currency_registry.names()
+        return jsonify({
+            'success': True,
+            'currencies': currencies,
+            'count': len(currencies)
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Unexpected error in get_currencies: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+def fetch_job(job):
+    """
+    Fetch the time series for one planned upstream request.
+    
+    Args:
+        job: FetchJob covering one or more requested pairs
+    
+    Returns:
+        Parsed Frankfurter response
+    """
+    url, params = upstream_request(job)
+    
+    logger.info(f"Fetching {job.base}/{','.join(job.targets)} from {job.start_date} to {job.end_date}")
+    
+    return fetch_json(url, params)
+
+
+def fetch_batch(batch):
+    """
+    Run a batch's upstream jobs concurrently and merge their outcomes.
+    
+    Batches served entirely from cache return immediately; others first
+    take an admission slot.
+    
+    Raises:
+        InvalidRequest: With status 503 if no fetch slot frees up in time
+    """
+    if not batch.jobs:
+        return batch
+    
+    with admission.slot():
+        futures = [(job, fetch_executor.submit(fetch_job, job)) for job in batch.jobs]
+        
+        for job, future in futures:
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = e
+            batch.add_outcome(job, outcome, requests.RequestException)
+    
+    return batch
+
+
 @app.route('/api/rates/multiple', methods=['POST'])
 def get_multiple_rates():
     """
@@ -41,130 +160,199 @@ def get_multiple_rates():
                     "base": "USD",
                     "target": "CAD",
                     "start_date": "2023-01-01",
-                    "end_date": "2023-12-31"
+                    "end_date": "2023-12-31",
+                    "max_points": 200
                 },
                 ...
-            ]
+            ],
+            "format": "rows",
+            "shape": "long",
+            "max_points": 500,
+            "interval": "daily"
         }
     
+    Options (body field or query parameter):
+        format: "rows" (default) returns a "data" array of {date, rate}
+            objects per pair; "columnar" returns parallel "rates" arrays and
+            a "dates_index" into a top-level "dates" list shared by pairs
+            with identical dates
+        shape: "long" (default) returns one entry per pair; "wide" returns a
+            single date-major matrix for the batch, {date: {target: rate}}
+            with the rows format or dates/columns/values arrays with the
+            columnar format
+        max_points: Optional cap on the points returned per pair (at least
+            3); longer series are downsampled with Largest-Triangle-Three-
+            Buckets. A "max_points" field on a pair overrides it for that pair
+        interval: "daily" (default), "weekly" or "monthly". Coarser intervals
+            return {date, open, high, low, close, mean} per period (parallel
+            arrays with the columnar format), dated by the period's first
+            day; long shape only, and max_points does not apply
+    
     Returns:
         JSON response with rates for all pairs
     
     Status Codes:
         200: Success
         400: Bad request
+        413: Too many pairs
+        422: Date ranges over the configured limits
         500: Internal server error
+        503: Too many requests fetching from upstream (with Retry-After)
     """
     try:
         data = request.get_json()
+        batch = fetch_batch(RatesBatch(get_pairs(data), parse_options(data, request.args)))
         
-        if not data or 'pairs' not in data:
-            return jsonify({
-                'success': False,
-                'error': 'Missing required field: pairs',
-                'message': 'Request body must contain a "pairs" array'
-            }), 400
+        # Immutable responses have their compressed bodies cached
+        g.cacheable_response = batch.is_final()
+        return jsonify(batch.response()), 200
         
-        pairs = data['pairs']
+    except InvalidRequest as e:
+        return jsonify(e.to_dict()), e.status, e.headers
+    except Exception as e:
+        logger.error(f"Unexpected error in get_multiple_rates: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/rates/stats', methods=['POST'])
+def get_rate_stats():
+    """
+    Get summary statistics for multiple currency pairs instead of their rates.
+    
+    Request Body (JSON):
+        {"pairs": [...]} with the same pair objects as /api/rates/multiple;
+        max_points fields are ignored, every daily point is used
+    
+    Each result carries the pair header plus count, mean, stdev, min and
+    max ({date, rate}), first and last ({date, rate}), change, change_pct,
+    and volatility / annualized_volatility of daily log returns. Statistics
+    a pair has too few points for are null.
+    
+    Returns:
+        JSON response with statistics for all pairs
+    
+    Status Codes:
+        200: Success
+        400: Bad request
+        413: Too many pairs
+        422: Date ranges over the configured limits
+        500: Internal server error
+        503: Too many requests fetching from upstream (with Retry-After)
+    """
+    try:
+        data = request.get_json()
+        batch = fetch_batch(RatesBatch(get_pairs(data), downsample=False))
         
-        if not isinstance(pairs, list) or len(pairs) == 0:
-            return jsonify({
-                'success': False,
-                'error': 'Invalid pairs format',
-                'message': 'pairs must be a non-empty array'
-            }), 400
+        g.cacheable_response = batch.is_final()
+        return jsonify(batch.response(stats_format)), 200
         
-        results = []
-        errors = []
+    except InvalidRequest as e:
+        return jsonify(e.to_dict()), e.status, e.headers
+    except Exception as e:
+        logger.error(f"Unexpected error in get_rate_stats: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/rates/rolling', methods=['POST'])
+def get_rolling_rates():
+    """
+    Get rates for multiple currency pairs with rolling-window indicators.
+    
+    Request Body (JSON):
+        {
+            "pairs": [...],
+            "windows": [20, 50],
+            "indicators": ["sma", "ema", "std", "bollinger"],
+            "num_std": 2
+        }
+    
+    Options (body field or query parameter, lists may be comma-separated):
+        windows: Window sizes in points (default [20])
+        indicators: Subset of sma, ema, std and bollinger (default all)
+        num_std: Bollinger band width in standard deviations (default 2)
+    
+    Each result carries "dates" and "rates" arrays and a "windows" list with
+    one entry per window size holding an array per indicator ("upper" and
+    "lower" for bollinger), aligned to the dates and null until the window
+    has filled. max_points fields on the pairs are ignored, so indicators
+    are computed over every daily point.
+    
+    Returns:
+        JSON response with rates and indicators for all pairs
+    
+    Status Codes:
+        200: Success
+        400: Bad request
+        413: Too many pairs
+        422: Date ranges or windows over the configured limits
+        500: Internal server error
+        503: Too many requests fetching from upstream (with Retry-After)
+    """
+    try:
+        data = request.get_json()
+        options = parse_rolling_options(data, request.args)
+        batch = fetch_batch(RatesBatch(get_pairs(data), downsample=False))
         
-        for idx, pair in enumerate(pairs):
-            try:
-                base = pair.get('base', '').upper()
-                target = pair.get('target', '').upper()
-                start_date = pair.get('start_date', '')
-                end_date = pair.get('end_date', datetime.now().strftime('%Y-%m-%d'))
-                
-                # Validate required fields
-                if not base or not target or not start_date:
-                    raise ValueError("Missing required fields: base, target, or start_date")
-                
-                # Validate currencies (you can expand this list)
-                supported = ['USD', 'CAD', 'EUR', 'GBP', 'JPY', 'AUD', 'CHF', 'NZD']
-                if base not in supported or target not in supported:
-                    raise ValueError(f"Unsupported currency. Supported: {', '.join(supported)}")
-                
-                if base == target:
-                    raise ValueError("Base and target currencies must be different")
-                
-                # Fetch from Frankfurter API
-                url = f"{FRANKFURT_API_URL}/{start_date}..{end_date}"
-                params = {'from': base, 'to': target}
-                
-                logger.info(f"Fetching {base}/{target} from {start_date} to {end_date}")
-                
-                response = requests.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                
-                api_data = response.json()
-                
-                # Transform data to array format
-                rates = []
-                if 'rates' in api_data:
-                    for date_str, rate_data in api_data['rates'].items():
-                        if target in rate_data:
-                            rates.append({
-                                'date': date_str,
-                                'rate': rate_data[target]
-                            })
-                
-                # Sort by date ascending
-                rates.sort(key=lambda x: x['date'])
-                
-                results.append({
-                    'success': True,
-                    'base_currency': base,
-                    'target_currency': target,
-                    'start_date': start_date,
-                    'end_date': end_date,
-                    'data': rates,
-                    'count': len(rates)
-                })
-                
-                logger.info(f"Successfully fetched {len(rates)} rates for {base}/{target}")
-                
-            except requests.RequestException as e:
-                logger.error(f"API request failed for pair {idx}: {str(e)}")
-                errors.append({
-                    'index': idx,
-                    'pair': pair,
-                    'error': f'API request failed: {str(e)}'
-                })
-            except ValueError as e:
-                logger.warning(f"Validation error for pair {idx}: {str(e)}")
-                errors.append({
-                    'index': idx,
-                    'pair': pair,
-                    'error': str(e)
-                })
-            except Exception as e:
-                logger.error(f"Unexpected error for pair {idx}: {str(e)}")
-                errors.append({
-                    'index': idx,
-                    'pair': pair,
-                    'error': f'Unexpected error: {str(e)}'
-                })
+        g.cacheable_response = batch.is_final()
+        return jsonify(batch.response(rolling_format(**options))), 200
         
+    except InvalidRequest as e:
+        return jsonify(e.to_dict()), e.status, e.headers
+    except Exception as e:
+        logger.error(f"Unexpected error in get_rolling_rates: {str(e)}")
         return jsonify({
-            'success': len(errors) == 0,
-            'results': results,
-            'errors': errors if errors else None,
-            'total_pairs': len(pairs),
-            'successful': len(results),
-            'failed': len(errors)
-        }), 200
+            'success': False,
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/rates/correlation', methods=['POST'])
+def get_rate_correlation():
+    """
+    Get the correlation matrix of daily log returns across multiple currency pairs.
+    
+    Request Body (JSON):
+        {"pairs": [...]} with the same pair objects as /api/rates/multiple;
+        max_points fields are ignored, every daily point is used
+    
+    Series are aligned on the union of their dates. A return is only taken
+    between consecutive dates where the pair has a rate, and each pair of
+    columns is correlated over the returns both have.
+    
+    Returns:
+        JSON response with per-pair headers plus "columns" (labelled as in
+        the wide shape), an N x N "correlation" matrix (null where fewer than
+        3 returns overlap or a series is constant) and the N x N count of
+        overlapping returns in "observations"
+    
+    Status Codes:
+        200: Success
+        400: Bad request
+        413: Too many pairs
+        422: Date ranges over the configured limits
+        500: Internal server error
+        503: Too many requests fetching from upstream (with Retry-After)
+    """
+    try:
+        data = request.get_json()
+        batch = fetch_batch(RatesBatch(get_pairs(data), downsample=False))
+        
+        g.cacheable_response = batch.is_final()
+        return jsonify(batch.response(correlation_format)), 200
         
+    except InvalidRequest as e:
+        return jsonify(e.to_dict()), e.status, e.headers
     except Exception as e:
-        logger.error(f"Unexpected error in get_multiple_rates: {str(e)}")
+        logger.error(f"Unexpected error in get_rate_correlation: {str(e)}")
         return jsonify({
             'success': False,
             'error': 'Internal server error',
@@ -172,6 +360,91 @@ def get_multiple_rates():
         }), 500
 
 
+@app.route('/api/rates/multiple/stream', methods=['POST'])
+def stream_multiple_rates():
+    """
+    Stream exchange rates for multiple currency pairs as newline-delimited JSON.
+    
+    Accepts the same body as /api/rates/multiple (long shape only). Each pair
+    is written as soon as it completes, so cached pairs and invalid pairs come
+    first and the rest follow in the order their upstream fetches finish.
+    
+    Records (one JSON object per line):
+        {"type": "result", "index": 0, "result": {...}}
+        {"type": "error", "index": 1, "error": {...}}
+        {"type": "summary", "success": false, "total_pairs": 2,
+         "successful": 1, "failed": 1}
+    
+    Returns:
+        application/x-ndjson stream ending with a summary record
+    
+    Status Codes:
+        200: Success (per-pair failures are reported as error records)
+        400: Bad request
+        413: Too many pairs
+        422: Date ranges over the configured limits
+        500: Internal server error
+        503: Too many requests fetching from upstream (with Retry-After)
+    """
+    try:
+        data = request.get_json()
+        batch = RatesBatch(get_pairs(data), parse_stream_options(data, request.args))
+        # The slot is held until the last record has been sent
+        if batch.jobs:
+            admission.acquire()
+    except InvalidRequest as e:
+        return jsonify(e.to_dict()), e.status, e.headers
+    except Exception as e:
+        logger.error(f"Unexpected error in stream_multiple_rates: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error',
+            'message': str(e)
+        }), 500
+    
+    def generate():
+        for record in batch.take_records():
+            yield dumps(record) + b'\n'
+        
+        futures = {fetch_executor.submit(fetch_job, job): job for job in batch.jobs}
+        
+        for future in as_completed(futures):
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = e
+            batch.add_outcome(futures[future], outcome, requests.RequestException)
+            
+            for record in batch.take_records():
+                yield dumps(record) + b'\n'
+        
+        yield dumps(batch.summary()) + b'\n'
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    if batch.jobs:
+        response.call_on_close(admission.release)
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """Compress response bodies using the encoding negotiated from Accept-Encoding."""
+    if response.is_streamed or response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    body, encoding = compress_body(
+        response.get_data(),
+        request.headers.get('Accept-Encoding'),
+        g.get('cacheable_response', False)
+    )
+    if encoding:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+    
+    return response
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors."""
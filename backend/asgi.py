@@ -0,0 +1,409 @@
+"""
+Asyncio variant of the rates API.
+
+Serves the same request and response schema as the Flask app, but fans out
+all Frankfurter calls on a single event loop with an async HTTP client, so
+in-flight upstream requests do not hold a worker thread each.
+
+Run with: uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+"""
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import partial
+import asyncio
+import logging
+
+import httpx
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse as StarletteJSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from config import (
+    ASYNC_MAX_CONNECTIONS,
+    FRANKFURT_API_URL,
+    UPSTREAM_KEEPALIVE_EXPIRY,
+    UPSTREAM_PREWARM_CONNECTIONS,
+    UPSTREAM_TIMEOUT,
+)
+from admission import AsyncAdmission
+from analytics import correlation_format, rolling_format, stats_format
+from planner import upstream_request
+from compression import compress_body
+from currencies import currency_registry
+from encoding import dumps
+from rates import (
+    InvalidRequest,
+    RatesBatch,
+    get_pairs,
+    parse_options,
+    parse_rolling_options,
+    parse_stream_options,
+)
+from upstream import PREWARM_PATH, request_key
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class JSONResponse(StarletteJSONResponse):
+    """JSON response rendered with the configured encoder."""
+
+    def render(self, content):
+        return dumps(content)
+
+
+async def compressed_json_response(request, render, status_code=200, cacheable=False):
+    """
+    Build a JSON response compressed with the encoding negotiated from Accept-Encoding.
+
+    render is called with no arguments to produce the response content.
+    Rendering, encoding and compression all run in one worker thread, since
+    for large batches each can take long enough to stall the event loop.
+    Immutable responses (cacheable=True) have their compressed bodies cached.
+    """
+    accept_encoding = request.headers.get('accept-encoding')
+
+    def build():
+        return compress_body(dumps(render()), accept_encoding, cacheable)
+
+    body, encoding = await asyncio.to_thread(build)
+    headers = {'Vary': 'Accept-Encoding'}
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(body, status_code=status_code, headers=headers, media_type='application/json')
+
+
+async def prewarm(client, connections=UPSTREAM_PREWARM_CONNECTIONS):
+    """Open pooled connections to Frankfurter before the first request."""
+    async def warm():
+        try:
+            await client.get(f"{FRANKFURT_API_URL}{PREWARM_PATH}")
+        except httpx.HTTPError as e:
+            logger.warning(f"Upstream prewarm failed: {str(e)}")
+
+    await asyncio.gather(*(warm() for _ in range(connections)))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Own one pooled keep-alive client per worker process."""
+    limits = httpx.Limits(
+        max_connections=ASYNC_MAX_CONNECTIONS,
+        max_keepalive_connections=ASYNC_MAX_CONNECTIONS,
+        keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY
+    )
+    async with httpx.AsyncClient(timeout=UPSTREAM_TIMEOUT, limits=limits) as client:
+        app.state.client = client
+        # Caps how many requests in this worker fetch from upstream at once
+        app.state.admission = AsyncAdmission()
+        # Load the currency list off the event loop; later refreshes run on
+        # the registry's own background thread
+        await asyncio.to_thread(currency_registry.codes)
+        # Warm in the background so startup is not blocked by the upstream
+        warmup = asyncio.create_task(prewarm(client))
+        yield
+        warmup.cancel()
+
+
+# Upstream requests currently in flight on this worker's event loop
+_inflight = {}
+
+
+async def _get_json(client, url, params):
+    response = await client.get(url, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+async def fetch_json(client, url, params):
+    """
+    GET a Frankfurter resource, sharing one call between concurrent callers.
+
+    The shared task is shielded so a cancelled caller does not cancel the
+    fetch for everyone else waiting on it.
+    """
+    key = request_key(url, params)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_get_json(client, url, params))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        logger.info(f"Joining in-flight upstream request {key}")
+
+    return await asyncio.shield(task)
+
+
+async def fetch_job(client, job):
+    """Async counterpart of app.fetch_job."""
+    url, params = upstream_request(job)
+
+    logger.info(f"Fetching {job.base}/{','.join(job.targets)} from {job.start_date} to {job.end_date}")
+
+    return await fetch_json(client, url, params)
+
+
+async def build_batch(pairs, options=None, downsample=True):
+    """
+    Build a RatesBatch off the event loop.
+
+    Construction reads the rate store, a blocking SQLite call that can wait
+    on another worker's write lock.
+    """
+    return await asyncio.to_thread(RatesBatch, pairs, options, downsample)
+
+
+async def add_outcome(batch, job, outcome):
+    """Merge a job's outcome off the event loop, since it writes through to the rate store."""
+    await asyncio.to_thread(batch.add_outcome, job, outcome, httpx.HTTPError)
+
+
+async def fetch_batch(request, batch):
+    """Async counterpart of app.fetch_batch."""
+    if not batch.jobs:
+        return batch
+
+    client = request.app.state.client
+    async with request.app.state.admission.slot():
+        # gather preserves argument order, so each outcome lines up with its job
+        outcomes = await asyncio.gather(
+            *(fetch_job(client, job) for job in batch.jobs),
+            return_exceptions=True
+        )
+
+    for job, outcome in zip(batch.jobs, outcomes):
+        await add_outcome(batch, job, outcome)
+
+    return batch
+
+
+async def health_check(request):
+    """Health check endpoint."""
+    return JSONResponse({
+        'status': 'healthy',
+        'service': 'currency-exchange-api',
+        'timestamp': datetime.utcnow().isoformat()
+    }, status_code=200)
+
+
+async def get_currencies(request):
+    """List the currencies accepted by the rates endpoints."""
+    try:
+        currencies = currency_registry.names()
+        return JSONResponse({
+            'success': True,
+            'currencies': currencies,
+            'count': len(currencies)
+        }, status_code=200)
+
+    except Exception as e:
+        logger.error(f"Unexpected error in get_currencies: {str(e)}")
+        return JSONResponse({
+            'success': False,
+            'error': 'Internal server error',
+            'message': str(e)
+        }, status_code=500)
+
+
+async def get_multiple_rates(request):
+    """
+    Get exchange rates for multiple currency pairs at once.
+
+    Accepts the same body and returns the same response as the Flask
+    /api/rates/multiple endpoint.
+    """
+    try:
+        data = await request.json()
+        batch = await fetch_batch(
+            request,
+            await build_batch(get_pairs(data), parse_options(data, request.query_params))
+        )
+
+        return await compressed_json_response(request, batch.response, 200, batch.is_final())
+
+    except InvalidRequest as e:
+        return JSONResponse(e.to_dict(), status_code=e.status, headers=e.headers)
+    except Exception as e:
+        logger.error(f"Unexpected error in get_multiple_rates: {str(e)}")
+        return JSONResponse({
+            'success': False,
+            'error': 'Internal server error',
+            'message': str(e)
+        }, status_code=500)
+
+
+async def get_rate_stats(request):
+    """
+    Get summary statistics for multiple currency pairs instead of their rates.
+
+    Accepts the same body and returns the same response as the Flask
+    /api/rates/stats endpoint.
+    """
+    try:
+        data = await request.json()
+        batch = await fetch_batch(request, await build_batch(get_pairs(data), downsample=False))
+
+        return await compressed_json_response(request, partial(batch.response, stats_format), 200, batch.is_final())
+
+    except InvalidRequest as e:
+        return JSONResponse(e.to_dict(), status_code=e.status, headers=e.headers)
+    except Exception as e:
+        logger.error(f"Unexpected error in get_rate_stats: {str(e)}")
+        return JSONResponse({
+            'success': False,
+            'error': 'Internal server error',
+            'message': str(e)
+        }, status_code=500)
+
+
+async def get_rolling_rates(request):
+    """
+    Get rates for multiple currency pairs with rolling-window indicators.
+
+    Accepts the same body and returns the same response as the Flask
+    /api/rates/rolling endpoint.
+    """
+    try:
+        data = await request.json()
+        options = parse_rolling_options(data, request.query_params)
+        batch = await fetch_batch(request, await build_batch(get_pairs(data), downsample=False))
+
+        return await compressed_json_response(
+            request, partial(batch.response, rolling_format(**options)), 200, batch.is_final()
+        )
+
+    except InvalidRequest as e:
+        return JSONResponse(e.to_dict(), status_code=e.status, headers=e.headers)
+    except Exception as e:
+        logger.error(f"Unexpected error in get_rolling_rates: {str(e)}")
+        return JSONResponse({
+            'success': False,
+            'error': 'Internal server error',
+            'message': str(e)
+        }, status_code=500)
+
+
+async def get_rate_correlation(request):
+    """
+    Get the correlation matrix of daily log returns across multiple currency pairs.
+
+    Accepts the same body and returns the same response as the Flask
+    /api/rates/correlation endpoint.
+    """
+    try:
+        data = await request.json()
+        batch = await fetch_batch(request, await build_batch(get_pairs(data), downsample=False))
+
+        return await compressed_json_response(request, partial(batch.response, correlation_format), 200, batch.is_final())
+
+    except InvalidRequest as e:
+        return JSONResponse(e.to_dict(), status_code=e.status, headers=e.headers)
+    except Exception as e:
+        logger.error(f"Unexpected error in get_rate_correlation: {str(e)}")
+        return JSONResponse({
+            'success': False,
+            'error': 'Internal server error',
+            'message': str(e)
+        }, status_code=500)
+
+
+async def stream_multiple_rates(request):
+    """
+    Stream exchange rates for multiple currency pairs as newline-delimited JSON.
+
+    Emits the same records as the Flask /api/rates/multiple/stream endpoint.
+    """
+    try:
+        data = await request.json()
+        batch = await build_batch(get_pairs(data), parse_stream_options(data, request.query_params))
+        # The slot is held until the response has finished, however it ends
+        admission = request.app.state.admission
+        if batch.jobs:
+            await admission.acquire()
+    except InvalidRequest as e:
+        return JSONResponse(e.to_dict(), status_code=e.status, headers=e.headers)
+    except Exception as e:
+        logger.error(f"Unexpected error in stream_multiple_rates: {str(e)}")
+        return JSONResponse({
+            'success': False,
+            'error': 'Internal server error',
+            'message': str(e)
+        }, status_code=500)
+
+    client = request.app.state.client
+
+    async def run(job):
+        try:
+            return job, await fetch_job(client, job)
+        except Exception as e:
+            return job, e
+
+    async def generate():
+        for record in batch.take_records():
+            yield dumps(record) + b'\n'
+
+        for next_done in asyncio.as_completed([run(job) for job in batch.jobs]):
+            job, outcome = await next_done
+            await add_outcome(batch, job, outcome)
+
+            for record in batch.take_records():
+                yield dumps(record) + b'\n'
+
+        yield dumps(batch.summary()) + b'\n'
+
+    async def release():
+        admission.release()
+
+    # Background tasks run even when the client disconnects before the body
+    # starts, which a finally block in the generator would not
+    return StreamingResponse(
+        generate(),
+        media_type='application/x-ndjson',
+        background=BackgroundTask(release) if batch.jobs else None
+    )
+
+
+async def not_found(request, exc):
+    """Handle 404 errors."""
+    return JSONResponse({
+        'success': False,
+        'error': 'Not found',
+        'message': 'The requested endpoint does not exist'
+    }, status_code=404)
+
+
+async def method_not_allowed(request, exc):
+    """Handle 405 errors."""
+    return JSONResponse({
+        'success': False,
+        'error': 'Method not allowed',
+        'message': 'The HTTP method is not allowed for this endpoint'
+    }, status_code=405)
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health_check, methods=['GET']),
+        Route('/api/currencies', get_currencies, methods=['GET']),
+        Route('/api/rates/multiple', get_multiple_rates, methods=['POST']),
+        Route('/api/rates/multiple/stream', stream_multiple_rates, methods=['POST']),
+        Route('/api/rates/stats', get_rate_stats, methods=['POST']),
+        Route('/api/rates/rolling', get_rolling_rates, methods=['POST']),
+        Route('/api/rates/correlation', get_rate_correlation, methods=['POST']),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+    ],
+    exception_handlers={
+        404: not_found,
+        405: method_not_allowed,
+    },
+    lifespan=lifespan,
+)
@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import hashlib
+import logging
+import threading
+
+from config import COMPRESSED_CACHE_MAX_ENTRIES, COMPRESSION_MIN_SIZE
+from rate_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+
+def _gzip(body, level):
+    return gzip.compress(body, compresslevel=level)
+
+
+def _brotli(body, level):
+    return brotli.compress(body, quality=level)
+
+
+def _zstd(body, level):
+    return zstandard.ZstdCompressor(level=level).compress(body)
+
+
+# Available codecs in server preference order, with (on-the-fly, cached)
+# compression levels: bodies compressed once and served many times are
+# worth compressing harder, but only off the request path
+CODECS = {}
+if zstandard is not None:
+    CODECS['zstd'] = (_zstd, 3, 19)
+if brotli is not None:
+    CODECS['br'] = (_brotli, 5, 11)
+CODECS['gzip'] = (_gzip, 6, 9)
+
+# Compressed bodies of immutable responses, keyed by body digest and encoding
+compressed_cache = LRUCache(COMPRESSED_CACHE_MAX_ENTRIES)
+
+# Single background thread recompressing cached bodies at the high level
+recompress_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='recompress')
+
+# Cache keys with a recompression queued or running
+_recompressing = set()
+_recompressing_lock = threading.Lock()
+
+
+def choose_encoding(accept_encoding):
+    """
+    Pick a content encoding from an Accept-Encoding header.
+
+    Codecs are ranked by the client's q-values, ties broken by server
+    preference. Codecs the client marks with q=0 are never used.
+
+    Returns:
+        Encoding name, or None to send the body uncompressed
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+
+    candidates = [
+        (weights.get(name, weights.get('*', 0.0)), -rank, name)
+        for rank, name in enumerate(CODECS)
+    ]
+    weight, _, name = max(candidates)
+    return name if weight > 0 else None
+
+
+def _recompress(key, body, compress, level):
+    """Replace a cached fast-level body with its high-level compression."""
+    try:
+        compressed = compress(body, level)
+        compressed_cache.set(key, compressed)
+        logger.info(f"Recompressed cached {key[1]} body ({len(body)} -> {len(compressed)} bytes)")
+    except Exception as e:
+        logger.warning(f"Recompressing cached {key[1]} body failed: {str(e)}")
+    finally:
+        with _recompressing_lock:
+            _recompressing.discard(key)
+
+
+def _schedule_recompress(key, body, compress, level):
+    with _recompressing_lock:
+        if key in _recompressing:
+            return
+        _recompressing.add(key)
+    recompress_executor.submit(_recompress, key, body, compress, level)
+
+
+def compress_body(body, accept_encoding, cacheable=False):
+    """
+    Compress a response body for a client if it is worth it.
+
+    Bodies below COMPRESSION_MIN_SIZE are left alone. When cacheable is set
+    the body is immutable, so its compressed form is cached and reused for
+    every identical body. The first request compresses at the fast level;
+    a background thread then recompresses it at the high level and replaces
+    the cache entry.
+
+    Returns:
+        Tuple of (body, encoding) where encoding is None if uncompressed
+    """
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return body, None
+
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return body, None
+
+    compress, fast_level, cached_level = CODECS[encoding]
+
+    if not cacheable:
+        return compress(body, fast_level), encoding
+
+    key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+    compressed = compressed_cache.get(key)
+    if compressed is None:
+        compressed = compress(body, fast_level)
+        compressed_cache.set(key, compressed)
+        logger.info(f"Cached {encoding} body ({len(body)} -> {len(compressed)} bytes)")
+        if cached_level != fast_level:
+            _schedule_recompress(key, body, compress, cached_level)
+
+    return compressed, encoding
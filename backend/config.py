@@ -0,0 +1,93 @@
+import os
+
+# Directory containing this backend
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Base URL for the Frankfurt Exchange Rates API
+FRANKFURT_API_URL = "https://api.frankfurter.app"
+
+# Timeout in seconds for a single upstream request
+UPSTREAM_TIMEOUT = float(os.environ.get('UPSTREAM_TIMEOUT', '10'))
+
+# Maximum number of upstream requests in flight at once, shared by all requests
+UPSTREAM_MAX_WORKERS = int(os.environ.get('UPSTREAM_MAX_WORKERS', '8'))
+
+# Maximum number of keep-alive connections pooled per worker process
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', str(UPSTREAM_MAX_WORKERS)))
+
+# Number of connections opened at startup, before the first request
+UPSTREAM_PREWARM_CONNECTIONS = int(os.environ.get('UPSTREAM_PREWARM_CONNECTIONS', '2'))
+
+# Seconds an idle pooled connection is kept open by the async app
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.environ.get('UPSTREAM_KEEPALIVE_EXPIRY', '60'))
+
+# Maximum number of upstream connections held by the async app
+ASYNC_MAX_CONNECTIONS = int(os.environ.get('ASYNC_MAX_CONNECTIONS', '100'))
+
+# Derive every pair from one all-currency EUR-base fetch per date range
+# instead of fetching each base separately ("true" or "false")
+DERIVE_CROSS_RATES = os.environ.get('DERIVE_CROSS_RATES', 'false').lower() in ('1', 'true', 'yes')
+
+# Fetch every target of a requested base and cache them all, so pairs added
+# later for the same base and range are served from memory ("true" or "false")
+PREFETCH_ALL_TARGETS = os.environ.get('PREFETCH_ALL_TARGETS', 'false').lower() in ('1', 'true', 'yes')
+
+# Maximum number of pairs in one request; larger requests get 413
+MAX_PAIRS_PER_REQUEST = int(os.environ.get('MAX_PAIRS_PER_REQUEST', '100'))
+
+# Maximum days between a pair's start_date and end_date (two years, as in
+# the dashboard's date picker); longer ranges get 422
+MAX_RANGE_DAYS = int(os.environ.get('MAX_RANGE_DAYS', '731'))
+
+# Maximum calendar days summed over every pair in one request; more gets 422
+MAX_REQUEST_POINTS = int(os.environ.get('MAX_REQUEST_POINTS', '50000'))
+
+# Maximum number of window sizes in one /api/rates/rolling request; more gets 422
+MAX_ROLLING_WINDOWS = int(os.environ.get('MAX_ROLLING_WINDOWS', '8'))
+
+# Maximum number of requests per worker process fetching from upstream at once
+MAX_CONCURRENT_FETCHES = int(os.environ.get('MAX_CONCURRENT_FETCHES', '32'))
+
+# Seconds a request waits for a fetch slot before it is rejected with 503
+ADMISSION_TIMEOUT = float(os.environ.get('ADMISSION_TIMEOUT', '2'))
+
+# Retry-After seconds sent with 503 responses when no fetch slot is free
+ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', '5'))
+
+# Maximum number of (base, target, date) entries held by the in-process rate cache.
+# Each entry costs roughly 270 bytes, so 100k entries is about 27 MB per worker.
+RATE_CACHE_MAX_ENTRIES = int(os.environ.get('RATE_CACHE_MAX_ENTRIES', '100000'))
+
+# Minutes after ECB publication (16:00 CET) before a day's rates are treated as final
+RATE_CACHE_SETTLE_MINUTES = int(os.environ.get('RATE_CACHE_SETTLE_MINUTES', '60'))
+
+# Seconds a freshly published, not yet final day is cached for
+RATE_CACHE_VOLATILE_TTL = int(os.environ.get('RATE_CACHE_VOLATILE_TTL', '300'))
+
+# JSON encoder for responses: "orjson" (falls back to "json" if not installed) or "json"
+RESPONSE_ENCODER = os.environ.get('RESPONSE_ENCODER', 'orjson').lower()
+
+# Maximum number of pre-encoded pair results kept in memory
+ENCODED_CACHE_MAX_ENTRIES = int(os.environ.get('ENCODED_CACHE_MAX_ENTRIES', '1024'))
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+
+# Maximum number of compressed bodies of immutable responses kept in memory
+COMPRESSED_CACHE_MAX_ENTRIES = int(os.environ.get('COMPRESSED_CACHE_MAX_ENTRIES', '256'))
+
+# Maximum number of pivoted wide-shape matrices kept in memory
+WIDE_CACHE_MAX_ENTRIES = int(os.environ.get('WIDE_CACHE_MAX_ENTRIES', '256'))
+
+# Maximum number of resampled (pair, interval) aggregates kept in memory
+AGGREGATE_CACHE_MAX_ENTRIES = int(os.environ.get('AGGREGATE_CACHE_MAX_ENTRIES', '1024'))
+
+# Seconds the supported-currency list from Frankfurter is used before refreshing
+CURRENCY_CACHE_TTL = int(os.environ.get('CURRENCY_CACHE_TTL', '86400'))
+
+# JSON file the currency list is mirrored to across restarts; set to an empty string to disable
+CURRENCY_CACHE_PATH = os.environ.get('CURRENCY_CACHE_PATH', os.path.join(BACKEND_DIR, 'currencies.json'))
+
+# SQLite file holding daily rates across restarts; set to an empty string to disable.
+# Point this at a persistent location so the store survives deploys.
+RATE_STORE_PATH = os.environ.get('RATE_STORE_PATH', os.path.join(BACKEND_DIR, 'rates.db'))
@@ -0,0 +1,72 @@
+from config import DERIVE_CROSS_RATES
+from series import RateSeries
+
+# Currency the ECB quotes every reference rate against
+CROSS_BASE = 'EUR'
+
+
+def canonical_pair(base, target):
+    """
+    Order two currencies the way the rate cache stores their series.
+
+    EUR comes first, matching how the ECB publishes rates; any other pair
+    is ordered alphabetically.
+    """
+    if target == CROSS_BASE or (base != CROSS_BASE and target < base):
+        return target, base
+    return base, target
+
+
+def as_canonical(series):
+    """
+    Return a series in canonical order, inverting it if needed.
+
+    Reciprocals are kept unrounded so a series fetched in the other
+    direction is served with its exact upstream rates; rounding happens
+    once, in combine_legs.
+    """
+    if canonical_pair(series.base, series.target) == (series.base, series.target):
+        return series
+    return series.inverse(digits=None)
+
+
+def pair_legs(base, target):
+    """
+    Return the (base, target) series a pair's rates are built from.
+
+    Normally that is the pair in canonical order, so a pair and its inverse
+    share one cached series and one upstream fetch. With
+    DERIVE_CROSS_RATES every pair is built from the EUR-base series of its
+    two currencies, so all pairs over a date range share one upstream EUR
+    matrix.
+    """
+    if not DERIVE_CROSS_RATES:
+        return [canonical_pair(base, target)]
+    return [(CROSS_BASE, currency) for currency in (base, target) if currency != CROSS_BASE]
+
+
+def combine_legs(base, target, legs):
+    """
+    Build a pair's series from the leg series named by pair_legs.
+
+    Args:
+        base: Pair base currency
+        target: Pair target currency
+        legs: Mapping of (base, target) leg to its RateSeries
+
+    Returns:
+        RateSeries for base/target
+    """
+    # Legs may hold unrounded reciprocals from as_canonical, so every branch
+    # rounds to DERIVED_RATE_DIGITS exactly once
+    if (base, target) in legs:
+        return legs[(base, target)].rounded()
+    if (target, base) in legs:
+        return legs[(target, base)].inverse()
+
+    # EUR->target / EUR->base, where a EUR leg is implicitly 1
+    return RateSeries.cross(
+        base, target,
+        legs.get((CROSS_BASE, target)),
+        legs.get((CROSS_BASE, base))
+    )
@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+
+from config import CURRENCY_CACHE_PATH, CURRENCY_CACHE_TTL, FRANKFURT_API_URL
+from upstream import fetch_json
+
+logger = logging.getLogger(__name__)
+
+# Used until the first successful load if Frankfurter is unreachable and
+# there is no cached copy on disk
+FALLBACK_CURRENCIES = {
+    'AUD': 'Australian Dollar',
+    'CAD': 'Canadian Dollar',
+    'CHF': 'Swiss Franc',
+    'EUR': 'Euro',
+    'GBP': 'British Pound',
+    'JPY': 'Japanese Yen',
+    'NZD': 'New Zealand Dollar',
+    'USD': 'United States Dollar',
+}
+
+# Seconds to wait before retrying after a failed refresh
+CURRENCY_RETRY_SECONDS = 300
+
+
+class CurrencyRegistry:
+    """
+    Currencies Frankfurter supports, loaded from its /currencies endpoint.
+
+    The list is kept in memory for CURRENCY_CACHE_TTL seconds and mirrored
+    to a JSON file so restarts do not need the network. Only the very first
+    load blocks; after that an expired list keeps being served while a
+    background thread refreshes it.
+    """
+
+    def __init__(self, path=CURRENCY_CACHE_PATH, ttl=CURRENCY_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._names = None
+        self._codes = frozenset()
+        self._expires_at = 0.0
+        self._refreshing = False
+
+    def _set(self, names, fetched_at):
+        self._names = dict(sorted(names.items()))
+        self._codes = frozenset(names)
+        self._expires_at = fetched_at + self.ttl
+
+    def _load_file(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                cached = json.load(f)
+            self._set(cached['currencies'], cached['fetched_at'])
+            logger.info(f"Loaded {len(self._codes)} currencies from {self.path}")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable currency cache {self.path}: {str(e)}")
+
+    def _save_file(self, names, fetched_at):
+        if not self.path:
+            return
+        try:
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'fetched_at': fetched_at, 'currencies': names}, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write currency cache {self.path}: {str(e)}")
+
+    def refresh(self):
+        """
+        Reload the list from Frankfurter.
+
+        On failure the current list (or FALLBACK_CURRENCIES if there is none
+        yet) stays in use and the refresh is retried after
+        CURRENCY_RETRY_SECONDS.
+        """
+        try:
+            names = fetch_json(f"{FRANKFURT_API_URL}/currencies")
+            if not isinstance(names, dict) or not names:
+                raise ValueError("Unexpected /currencies response")
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Currency refresh failed: {str(e)}")
+            with self._lock:
+                if self._names is None:
+                    self._set(FALLBACK_CURRENCIES, time.time())
+                self._expires_at = time.time() + CURRENCY_RETRY_SECONDS
+            return
+
+        fetched_at = time.time()
+        with self._lock:
+            self._set(names, fetched_at)
+        self._save_file(names, fetched_at)
+        logger.info(f"Loaded {len(names)} currencies from Frankfurter")
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='currency-refresh', daemon=True).start()
+
+    def _ensure_loaded(self):
+        if self._names is None:
+            with self._lock:
+                if self._names is None:
+                    self._load_file()
+            if self._names is None:
+                self.refresh()
+
+        if time.time() >= self._expires_at:
+            self._refresh_in_background()
+
+    def codes(self):
+        """Return the supported currency codes as a frozenset."""
+        self._ensure_loaded()
+        return self._codes
+
+    def names(self):
+        """Return a {code: name} mapping of supported currencies, sorted by code."""
+        self._ensure_loaded()
+        return self._names
+
+
+currency_registry = CurrencyRegistry()
@@ -0,0 +1,58 @@
+import numpy as np
+
+# LTTB always keeps the first and last point, so it needs room for one more
+MIN_POINTS = 3
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Pick the points of a series to keep with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. The points in between are
+    split into threshold - 2 equal buckets, and from each bucket the point
+    forming the largest triangle with the previously kept point and the
+    average of the next bucket is kept. Bucket averages are computed for all
+    buckets at once from cumulative sums; each bucket's triangle areas are
+    computed as one array operation.
+
+    Args:
+        x: Ascending x values (day ordinals)
+        y: Values at each x
+        threshold: Number of points to keep
+
+    Returns:
+        Ascending int64 array of indices into x and y
+    """
+    n = len(x)
+    if threshold >= n or threshold < MIN_POINTS:
+        return np.arange(n, dtype=np.int64)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket i covers [edges[i], edges[i + 1]); the last point is its own
+    # final bucket so the last regular bucket averages towards it. Edges are
+    # computed in integer arithmetic so they never round down a point
+    edges = np.append(np.arange(threshold - 1, dtype=np.int64) * (n - 2) // (threshold - 2) + 1, n)
+
+    x_sums = np.concatenate(([0.0], np.cumsum(x)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = np.diff(edges)
+    x_means = (x_sums[edges[1:]] - x_sums[edges[:-1]]) / sizes
+    y_means = (y_sums[edges[1:]] - y_sums[edges[:-1]]) / sizes
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        cx, cy = x_means[bucket + 1], y_means[bucket + 1]
+        ax, ay = x[a], y[a]
+
+        areas = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        a = lo + int(np.argmax(areas))
+        selected[bucket + 1] = a
+
+    return selected
@@ -0,0 +1,64 @@
+import json
+import logging
+
+import numpy as np
+
+from config import RESPONSE_ENCODER
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+if RESPONSE_ENCODER == 'orjson' and orjson is None:
+    logger.warning("RESPONSE_ENCODER is orjson but orjson is not installed; using json")
+
+USE_ORJSON = RESPONSE_ENCODER == 'orjson' and orjson is not None
+
+# orjson >= 3.9 can embed already-encoded JSON without re-serializing it
+SUPPORTS_FRAGMENTS = USE_ORJSON and hasattr(orjson, 'Fragment')
+
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def _default(obj):
+    """Let the stdlib encoder handle numpy arrays and scalars."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """
+    Encode a response body to JSON bytes with the configured encoder.
+
+    numpy arrays and scalars are accepted anywhere in the body; orjson
+    serializes them natively without converting to Python lists first.
+    """
+    if USE_ORJSON:
+        return orjson.dumps(obj, option=ORJSON_OPTIONS)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """Decode a JSON request body."""
+    if USE_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def pre_encode(obj):
+    """
+    Encode part of a response once so it can be embedded in many responses.
+
+    With orjson the result is a Fragment that later dumps() calls copy into
+    their output verbatim. Other encoders cannot embed raw JSON, so the
+    object is returned unchanged and encoded again each time.
+    """
+    if SUPPORTS_FRAGMENTS:
+        return orjson.Fragment(dumps(obj))
+    return obj
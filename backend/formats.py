@@ -0,0 +1,321 @@
+import numpy as np
+
+from config import AGGREGATE_CACHE_MAX_ENTRIES, ENCODED_CACHE_MAX_ENTRIES, WIDE_CACHE_MAX_ENTRIES
+from encoding import pre_encode
+from rate_cache import LRUCache, is_final
+from resample import resample
+from series import ordinals_to_strings
+
+SHAPES = ('long', 'wide')
+
+# Pre-encoded rows-format results for pairs whose windows are final
+result_cache = LRUCache(ENCODED_CACHE_MAX_ENTRIES)
+
+# Pre-encoded pivoted matrices for batches whose windows are all final
+wide_cache = LRUCache(WIDE_CACHE_MAX_ENTRIES)
+
+# Resampled aggregates for pairs whose windows are final, keyed by pair and interval
+aggregate_cache = LRUCache(AGGREGATE_CACHE_MAX_ENTRIES)
+
+AGGREGATE_FIELDS = ('open', 'high', 'low', 'close', 'mean')
+
+
+def pair_key(pair_request):
+    return (
+        pair_request.base, pair_request.target,
+        pair_request.start_date, pair_request.end_date,
+        pair_request.max_points
+    )
+
+
+def pair_header(pair_request, series):
+    """Fields shared by every result format."""
+    return {
+        'success': True,
+        'base_currency': pair_request.base,
+        'target_currency': pair_request.target,
+        'start_date': pair_request.start_date,
+        'end_date': pair_request.end_date,
+        'count': len(series)
+    }
+
+
+def rows_format(entries):
+    """
+    Default format: each result carries a "data" array of {date, rate} objects.
+
+    Results for windows that can no longer change are encoded once and
+    reused verbatim by later responses.
+
+    Args:
+        entries: List of (pair_request, series) in result order
+
+    Returns:
+        Tuple of (results, extra top-level response fields)
+    """
+    results = []
+    for pair_request, series in entries:
+        cacheable = is_final(pair_request.end_date)
+        result = result_cache.get(pair_key(pair_request)) if cacheable else None
+
+        if result is None:
+            result = pair_header(pair_request, series)
+            result['data'] = series.to_records()
+            if cacheable:
+                result = pre_encode(result)
+                result_cache.set(pair_key(pair_request), result)
+
+        results.append(result)
+    return results, {}
+
+
+def columnar_format(entries):
+    """
+    Columnar format: parallel date and rate arrays instead of per-point objects.
+
+    Each distinct date array is emitted once in the top-level "dates" list
+    and results refer to it by "dates_index", so pairs sharing a window
+    share a single array.
+
+    Args:
+        entries: List of (pair_request, series) in result order
+
+    Returns:
+        Tuple of (results, extra top-level response fields)
+    """
+    dates = []
+    index_by_days = {}
+    results = []
+
+    for pair_request, series in entries:
+        key = series.days.tobytes()
+        if key not in index_by_days:
+            index_by_days[key] = len(dates)
+            dates.append(series.date_strings())
+
+        result = pair_header(pair_request, series)
+        result['dates_index'] = index_by_days[key]
+        result['rates'] = series.rates
+        results.append(result)
+
+    return results, {'format': 'columnar', 'dates': dates}
+
+
+FORMATTERS = {
+    'rows': rows_format,
+    'columnar': columnar_format,
+}
+
+
+def column_label(pair_request, single_base):
+    return pair_request.target if single_base else f"{pair_request.base}/{pair_request.target}"
+
+
+def pivot(entries):
+    """
+    Align every series on the union of their dates in one matrix.
+
+    Columns are labelled by target currency when the batch has a single
+    base, otherwise by "BASE/TARGET". A pair requested more than once fills
+    the same column.
+
+    Returns:
+        Tuple of (days, labels, matrix) where matrix is a float64 array of
+        shape (len(days), len(labels)) with NaN for missing points
+    """
+    single_base = len({pair_request.base for pair_request, _ in entries}) == 1
+
+    columns = {}
+    for pair_request, _ in entries:
+        columns.setdefault(column_label(pair_request, single_base), len(columns))
+
+    if entries:
+        days = np.unique(np.concatenate([series.days for _, series in entries]))
+    else:
+        days = np.empty(0, dtype=np.int32)
+
+    matrix = np.full((len(days), len(columns)), np.nan)
+    for pair_request, series in entries:
+        column = columns[column_label(pair_request, single_base)]
+        rows = np.searchsorted(days, series.days)
+        empty = np.isnan(matrix[rows, column])
+        matrix[rows[empty], column] = series.rates[empty]
+
+    return days, list(columns), matrix
+
+
+def build_wide(entries, result_format):
+    """Pivot a batch and encode the matrix in the requested format."""
+    days, labels, matrix = pivot(entries)
+    dates = ordinals_to_strings(days)
+    present = ~np.isnan(matrix)
+
+    if result_format == 'columnar':
+        values = matrix.astype(object)
+        values[~present] = None
+        return {
+            'shape': 'wide',
+            'format': 'columnar',
+            'dates': dates,
+            'columns': labels,
+            'values': values.T.tolist()
+        }
+
+    rates = {}
+    for date_str, row, row_present in zip(dates, matrix.tolist(), present.tolist()):
+        rates[date_str] = {
+            label: rate
+            for label, rate, ok in zip(labels, row, row_present)
+            if ok
+        }
+
+    return {
+        'shape': 'wide',
+        'columns': labels,
+        'rates': rates
+    }
+
+
+def wide_format(entries, result_format):
+    """
+    Wide shape: one date-major matrix for the whole batch.
+
+    With the rows format the matrix is {date: {label: rate}}, the shape the
+    dashboard chart and grid consume. With the columnar format it is
+    parallel "dates", "columns" and per-column "values" arrays with null for
+    missing points. Results keep their per-pair header without data.
+
+    Encoded matrices are cached when every window in the batch is final.
+
+    Returns:
+        Tuple of (results, extra top-level response fields)
+    """
+    results = [pair_header(pair_request, series) for pair_request, series in entries]
+
+    cacheable = bool(entries) and all(is_final(pair_request.end_date) for pair_request, _ in entries)
+    key = (result_format, tuple(pair_key(pair_request) for pair_request, _ in entries))
+
+    extra = wide_cache.get(key) if cacheable else None
+    if extra is None:
+        extra = build_wide(entries, result_format)
+        if cacheable:
+            extra = {name: pre_encode(value) for name, value in extra.items()}
+            wide_cache.set(key, extra)
+
+    return results, extra
+
+
+def aggregates_for(pair_request, series, interval):
+    """Resample a pair's series, reusing earlier work for final windows."""
+    cacheable = is_final(pair_request.end_date)
+    key = (pair_request.base, pair_request.target, pair_request.start_date, pair_request.end_date, interval)
+
+    aggregates = aggregate_cache.get(key) if cacheable else None
+    if aggregates is None:
+        aggregates = resample(series, interval)
+        if cacheable:
+            aggregate_cache.set(key, aggregates)
+    return aggregates
+
+
+def aggregate_header(pair_request, aggregates, interval):
+    result = pair_header(pair_request, aggregates.days)
+    result['interval'] = interval
+    return result
+
+
+def aggregate_rows_format(entries, interval):
+    """
+    Rows format for resampled series: each result carries a "data" array of
+    {date, open, high, low, close, mean} objects, one per bucket.
+
+    Returns:
+        Tuple of (results, extra top-level response fields)
+    """
+    results = []
+    for pair_request, series in entries:
+        aggregates = aggregates_for(pair_request, series, interval)
+        columns = [ordinals_to_strings(aggregates.days)]
+        columns.extend(getattr(aggregates, field).tolist() for field in AGGREGATE_FIELDS)
+
+        result = aggregate_header(pair_request, aggregates, interval)
+        result['data'] = [dict(zip(('date',) + AGGREGATE_FIELDS, row)) for row in zip(*columns)]
+        results.append(result)
+
+    return results, {'interval': interval}
+
+
+def aggregate_columnar_format(entries, interval):
+    """
+    Columnar format for resampled series: parallel open/high/low/close/mean
+    arrays with a "dates_index" into the shared top-level "dates" list.
+
+    Returns:
+        Tuple of (results, extra top-level response fields)
+    """
+    dates = []
+    index_by_days = {}
+    results = []
+
+    for pair_request, series in entries:
+        aggregates = aggregates_for(pair_request, series, interval)
+        key = aggregates.days.tobytes()
+        if key not in index_by_days:
+            index_by_days[key] = len(dates)
+            dates.append(ordinals_to_strings(aggregates.days))
+
+        result = aggregate_header(pair_request, aggregates, interval)
+        result['dates_index'] = index_by_days[key]
+        for field in AGGREGATE_FIELDS:
+            result[field] = getattr(aggregates, field)
+        results.append(result)
+
+    return results, {'format': 'columnar', 'interval': interval, 'dates': dates}
+
+
+AGGREGATE_FORMATTERS = {
+    'rows': aggregate_rows_format,
+    'columnar': aggregate_columnar_format,
+}
+
+
+def format_result(pair_request, series, result_format='rows', interval='daily'):
+    """
+    Serialize one pair's result on its own, for streamed responses.
+
+    With the columnar format the result carries its own "dates" array
+    since there is no top-level list to index into.
+    """
+    if result_format == 'columnar':
+        if interval == 'daily':
+            result = pair_header(pair_request, series)
+            result['dates'] = series.date_strings()
+            result['rates'] = series.rates
+            return result
+
+        aggregates = aggregates_for(pair_request, series, interval)
+        result = aggregate_header(pair_request, aggregates, interval)
+        result['dates'] = ordinals_to_strings(aggregates.days)
+        for field in AGGREGATE_FIELDS:
+            result[field] = getattr(aggregates, field)
+        return result
+
+    if interval == 'daily':
+        results, _ = rows_format([(pair_request, series)])
+    else:
+        results, _ = aggregate_rows_format([(pair_request, series)], interval)
+    return results[0]
+
+
+def format_results(entries, result_format='rows', shape='long', interval='daily'):
+    """
+    Serialize a batch's results in the requested format, shape and interval.
+
+    Returns:
+        Tuple of (results, extra top-level response fields)
+    """
+    if shape == 'wide':
+        return wide_format(entries, result_format)
+    if interval != 'daily':
+        return AGGREGATE_FORMATTERS[result_format](entries, interval)
+    return FORMATTERS[result_format](entries)
@@ -0,0 +1,73 @@
+from collections import namedtuple
+from datetime import date, timedelta
+
+from config import FRANKFURT_API_URL
+
+# One upstream time series request and the pairs it answers; all_targets
+# jobs ask for every currency the upstream has instead of just targets
+FetchJob = namedtuple('FetchJob', 'base targets start_date end_date members all_targets')
+
+
+def plan_fetches(pair_requests, all_targets=False):
+    """
+    Group validated pairs into as few upstream requests as possible.
+
+    Pairs are grouped by base currency, and within a base their date windows
+    are merged into the minimal set of covering ranges (overlapping or
+    touching windows become one range). Each range is fetched once with a
+    comma-separated "to" list of every target that needs it, and each pair's
+    own window is sliced from the shared response.
+
+    Args:
+        pair_requests: List of PairRequest tuples
+        all_targets: Fetch every currency for each range rather than only
+            the requested targets
+
+    Returns:
+        List of FetchJob tuples, ordered by base and then by start date
+    """
+    by_base = {}
+    for pair_request in pair_requests:
+        by_base.setdefault(pair_request.base, []).append(pair_request)
+
+    jobs = []
+    for base, members in by_base.items():
+        for start, end, group in merge_windows(members):
+            targets = tuple(sorted({member.target for member in group}))
+            jobs.append(FetchJob(base, targets, start.isoformat(), end.isoformat(), group, all_targets))
+
+    return jobs
+
+
+def merge_windows(pair_requests):
+    """
+    Merge the date windows of pairs into minimal covering ranges.
+
+    Returns:
+        List of (start, end, members) tuples with non-overlapping ranges
+    """
+    windows = sorted(
+        ((date.fromisoformat(member.start_date), date.fromisoformat(member.end_date), member)
+         for member in pair_requests),
+        key=lambda window: window[:2]
+    )
+
+    ranges = []
+    for start, end, member in windows:
+        if ranges and start <= ranges[-1][1] + timedelta(days=1):
+            current = ranges[-1]
+            current[1] = max(current[1], end)
+            current[2].append(member)
+        else:
+            ranges.append([start, end, [member]])
+
+    return [tuple(current) for current in ranges]
+
+
+def upstream_request(job):
+    """Build the Frankfurter time series URL and query params for a job."""
+    url = f"{FRANKFURT_API_URL}/{job.start_date}..{job.end_date}"
+    params = {'from': job.base}
+    if not job.all_targets:
+        params['to'] = ','.join(job.targets)
+    return url, params
@@ -0,0 +1,226 @@
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+import logging
+import threading
+
+import numpy as np
+
+from config import RATE_CACHE_MAX_ENTRIES, RATE_CACHE_SETTLE_MINUTES, RATE_CACHE_VOLATILE_TTL
+from rate_store import open_rate_store
+from series import RateSeries
+
+logger = logging.getLogger(__name__)
+
+# The ECB publishes reference rates around 16:00 CET on business days
+ECB_TIMEZONE = ZoneInfo('Europe/Berlin')
+ECB_PUBLICATION_TIME = time(16, 0)
+
+# Sentinel distinguishing "not cached" from a cached day without a rate
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe bounded mapping with LRU eviction and optional expiry."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None, now=None):
+        return self.get_many([key], default, now)[0]
+
+    def get_many(self, keys, default=None, now=None):
+        """Look up several keys under one lock acquisition."""
+        now = now if now is not None else datetime.now(timezone.utc).timestamp()
+        values = []
+
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    values.append(default)
+                    continue
+
+                value, expires_at = entry
+                if expires_at is not None and expires_at <= now:
+                    del self._entries[key]
+                    values.append(default)
+                    continue
+
+                self._entries.move_to_end(key)
+                values.append(value)
+
+        return values
+
+    def set(self, key, value, expires_at=None):
+        self.set_many([(key, value, expires_at)])
+
+    def set_many(self, items):
+        """
+        Store several entries under one lock acquisition.
+
+        Args:
+            items: Iterable of (key, value, expires_at) tuples, where
+                expires_at is a POSIX timestamp or None to never expire
+        """
+        with self._lock:
+            for key, value, expires_at in items:
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def publication_time(day):
+    """Return the moment the ECB publishes rates for a given day."""
+    return datetime.combine(day, ECB_PUBLICATION_TIME, tzinfo=ECB_TIMEZONE)
+
+
+def entry_expiry(day, now):
+    """
+    Decide how long a cached day stays valid.
+
+    Days whose publication is well in the past never change and are kept
+    until evicted. Days not yet published expire at publication time, and
+    days just published are re-checked on a short TTL in case the ECB or
+    Frankfurter is running late.
+
+    Returns:
+        POSIX timestamp, or None if the day is immutable
+    """
+    published = publication_time(day)
+    if now >= published + timedelta(minutes=RATE_CACHE_SETTLE_MINUTES):
+        return None
+    if now < published:
+        return published.timestamp()
+    return (now + timedelta(seconds=RATE_CACHE_VOLATILE_TTL)).timestamp()
+
+
+def is_final(date_str):
+    """Return True once a day's published rates can no longer change."""
+    return entry_expiry(date.fromisoformat(date_str), datetime.now(timezone.utc)) is None
+
+
+class RateCache:
+    """
+    Per-day exchange rate cache keyed by (base, target, date).
+
+    Every calendar day of a fetched window is stored, including weekends and
+    holidays (as None), so a window can be recognised as fully cached
+    without knowing the ECB business calendar.
+
+    When a RateStore is attached it acts as a second tier: days missing from
+    memory are range-scanned from disk before being reported as gaps, and
+    every stored window is written through to disk.
+    """
+
+    def __init__(self, maxsize=RATE_CACHE_MAX_ENTRIES, store=None):
+        self._entries = LRUCache(maxsize)
+        self.store = store
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _scan(self, base, target, start, end):
+        """Return (series, gaps) for a window of ordinals from memory only."""
+        keys = [(base, target, ordinal) for ordinal in range(start, end + 1)]
+        values = self._entries.get_many(keys, _MISSING)
+
+        days = []
+        rates = []
+        gaps = []
+        gap_start = None
+
+        for ordinal, value in zip(range(start, end + 1), values):
+            if value is _MISSING:
+                if gap_start is None:
+                    gap_start = ordinal
+                continue
+
+            if gap_start is not None:
+                gaps.append((gap_start, ordinal - 1))
+                gap_start = None
+
+            if value is not None:
+                days.append(ordinal)
+                rates.append(value)
+
+        if gap_start is not None:
+            gaps.append((gap_start, end))
+
+        return RateSeries(base, target, days, rates), gaps
+
+    def get_window(self, base, target, start_date, end_date):
+        """
+        Return what the cache holds for a window.
+
+        Returns:
+            Tuple of (series, gaps) where series is a RateSeries of the
+            cached days with a rate and gaps is a list of (start_date,
+            end_date) runs of days missing from the cache, in date order
+        """
+        start = date.fromisoformat(start_date).toordinal()
+        end = date.fromisoformat(end_date).toordinal()
+
+        series, gaps = self._scan(base, target, start, end)
+
+        if gaps and self.store is not None:
+            rows = self.store.load_window(base, target, gaps[0][0], gaps[-1][1])
+            if rows:
+                self._entries.set_many(
+                    ((base, target, day), rate, expires_at)
+                    for day, rate, expires_at in rows
+                )
+                series, gaps = self._scan(base, target, start, end)
+
+        gaps = [
+            (date.fromordinal(first).isoformat(), date.fromordinal(last).isoformat())
+            for first, last in gaps
+        ]
+        return series, gaps
+
+    def store_window(self, start_date, end_date, series):
+        """
+        Record a fetched window.
+
+        Args:
+            series: RateSeries fetched for the window; days of the window
+                without a point are stored as having no published rate
+        """
+        base, target = series.base, series.target
+        now = datetime.now(timezone.utc)
+        start = date.fromisoformat(start_date).toordinal()
+        end = date.fromisoformat(end_date).toordinal()
+
+        # Spread the series over every day of the window, NaN marking no rate
+        window = series.window(start_date, end_date)
+        rates = np.full(end - start + 1, np.nan)
+        rates[window.days - start] = window.rates
+
+        rows = [
+            (base, target, ordinal, None if np.isnan(rate) else rate,
+             entry_expiry(date.fromordinal(ordinal), now))
+            for ordinal, rate in zip(range(start, end + 1), rates.tolist())
+        ]
+
+        self._entries.set_many(
+            ((base, target, ordinal), rate, expires_at)
+            for _, _, ordinal, rate, expires_at in rows
+        )
+
+        if self.store is not None:
+            self.store.upsert(rows)
+
+
+# Shared by every request handled by this worker process
+rate_cache = RateCache(store=open_rate_store())
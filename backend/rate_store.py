@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+import logging
+import os
+import sqlite3
+import threading
+
+from config import RATE_STORE_PATH
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rates (
+    base TEXT NOT NULL,
+    target TEXT NOT NULL,
+    day INTEGER NOT NULL,   -- proleptic Gregorian ordinal (date.toordinal())
+    rate REAL,              -- NULL when no rate was published that day
+    expires_at REAL,        -- POSIX timestamp, NULL once the day is final
+    PRIMARY KEY (base, target, day)
+) WITHOUT ROWID
+"""
+
+UPSERT = """
+INSERT INTO rates (base, target, day, rate, expires_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (base, target, day) DO UPDATE SET
+    rate = excluded.rate,
+    expires_at = excluded.expires_at
+"""
+
+SELECT_WINDOW = """
+SELECT day, rate, expires_at FROM rates
+WHERE base = ? AND target = ? AND day BETWEEN ? AND ?
+  AND (expires_at IS NULL OR expires_at > ?)
+ORDER BY day
+"""
+
+
+class RateStore:
+    """
+    On-disk daily rate store shared by every worker process on a node.
+
+    Rows mirror the in-process cache entries, keyed by (base, target, day).
+    The database runs in WAL mode so readers in other workers are never
+    blocked by a writer. Each thread of each process opens its own
+    connection, since sqlite3 connections cannot cross threads or forks.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(SCHEMA)
+
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def load_window(self, base, target, start, end):
+        """
+        Range-scan the unexpired rows of a window.
+
+        Args:
+            start: First day of the window as a date ordinal
+            end: Last day of the window as a date ordinal
+
+        Returns:
+            List of (day, rate, expires_at) tuples ordered by day
+        """
+        now = datetime.now(timezone.utc).timestamp()
+        try:
+            return self._connect().execute(SELECT_WINDOW, (base, target, start, end, now)).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Rate store read failed for {base}/{target}: {str(e)}")
+            return []
+
+    def upsert(self, rows):
+        """
+        Bulk insert or replace rows in a single transaction.
+
+        Args:
+            rows: Iterable of (base, target, day, rate, expires_at) tuples
+        """
+        try:
+            connection = self._connect()
+            with connection:
+                connection.execute('BEGIN')
+                connection.executemany(UPSERT, rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Rate store write failed: {str(e)}")
+
+
+def open_rate_store(path=RATE_STORE_PATH):
+    """Return the configured store, or None when persistence is disabled."""
+    if not path:
+        return None
+    logger.info(f"Using rate store at {path}")
+    return RateStore(path)
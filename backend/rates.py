@@ -0,0 +1,635 @@
+from collections import namedtuple
+import numbers
+from datetime import date, datetime
+import logging
+
+from analytics import ROLLING_INDICATORS
+from config import (
+    DERIVE_CROSS_RATES,
+    MAX_PAIRS_PER_REQUEST,
+    MAX_RANGE_DAYS,
+    MAX_REQUEST_POINTS,
+    MAX_ROLLING_WINDOWS,
+    PREFETCH_ALL_TARGETS,
+)
+from crosses import as_canonical, canonical_pair, combine_legs, pair_legs
+from currencies import currency_registry
+from downsample import MIN_POINTS
+from formats import FORMATTERS, SHAPES, format_result, format_results
+from planner import plan_fetches
+from rate_cache import is_final, rate_cache
+from resample import INTERVALS
+from series import RateSeries, to_ordinal
+
+logger = logging.getLogger(__name__)
+
+# A validated pair together with its position in the request body
+PairRequest = namedtuple('PairRequest', 'index pair base target start_date end_date max_points')
+
+
+class InvalidRequest(Exception):
+    """Raised when a request cannot be processed at all."""
+
+    def __init__(self, error, message, status=400, headers=None):
+        super().__init__(message)
+        self.error = error
+        self.message = message
+        self.status = status
+        self.headers = headers or {}
+
+    def to_dict(self):
+        return {
+            'success': False,
+            'error': self.error,
+            'message': self.message
+        }
+
+
+def get_pairs(data):
+    """
+    Extract the "pairs" array from a request body.
+
+    Raises:
+        InvalidRequest: If the body has no pairs or pairs is not a non-empty
+            list (400), or has more than MAX_PAIRS_PER_REQUEST pairs (413)
+    """
+    if not data or 'pairs' not in data:
+        raise InvalidRequest(
+            'Missing required field: pairs',
+            'Request body must contain a "pairs" array'
+        )
+
+    pairs = data['pairs']
+
+    if not isinstance(pairs, list) or len(pairs) == 0:
+        raise InvalidRequest(
+            'Invalid pairs format',
+            'pairs must be a non-empty array'
+        )
+
+    if len(pairs) > MAX_PAIRS_PER_REQUEST:
+        raise InvalidRequest(
+            'Too many pairs',
+            f"A request may contain at most {MAX_PAIRS_PER_REQUEST} pairs",
+            status=413
+        )
+
+    return pairs
+
+
+def parse_max_points(value):
+    """
+    Validate a max_points value from a request body or query string.
+
+    Returns:
+        The limit as an int, or None if no limit was given
+
+    Raises:
+        ValueError: If the value is not an integer of at least MIN_POINTS
+    """
+    if value is None:
+        return None
+
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+
+    if isinstance(value, bool) or not isinstance(value, numbers.Integral) or value < MIN_POINTS:
+        raise ValueError(f"max_points must be an integer of at least {MIN_POINTS}")
+
+    return int(value)
+
+
+def parse_options(data, query=None):
+    """
+    Read response options from the request body, falling back to the query string.
+
+    Options:
+        format: "rows" (default) or "columnar"
+        shape: "long" (default) for one entry per pair, or "wide" for a
+            single date-major matrix across the batch
+        max_points: Optional limit on the points returned per pair; longer
+            series are downsampled with LTTB
+        interval: "daily" (default), "weekly" or "monthly"; coarser
+            intervals return open/high/low/close/mean per period (long
+            shape only)
+
+    Raises:
+        InvalidRequest: If an option has an unsupported value
+    """
+    def option(name, default):
+        value = data.get(name) if isinstance(data, dict) else None
+        if value is None and query is not None:
+            value = query.get(name)
+        return default if value is None else value
+
+    result_format = str(option('format', 'rows')).lower()
+    if result_format not in FORMATTERS:
+        raise InvalidRequest(
+            'Invalid format',
+            f"format must be one of: {', '.join(FORMATTERS)}"
+        )
+
+    shape = str(option('shape', 'long')).lower()
+    if shape not in SHAPES:
+        raise InvalidRequest(
+            'Invalid shape',
+            f"shape must be one of: {', '.join(SHAPES)}"
+        )
+
+    try:
+        max_points = parse_max_points(option('max_points', None))
+    except ValueError as e:
+        raise InvalidRequest('Invalid max_points', str(e))
+
+    interval = str(option('interval', 'daily')).lower()
+    if interval not in INTERVALS:
+        raise InvalidRequest(
+            'Invalid interval',
+            f"interval must be one of: {', '.join(INTERVALS)}"
+        )
+    if interval != 'daily' and shape != 'long':
+        raise InvalidRequest(
+            'Invalid interval',
+            'Aggregated intervals are only available with the long shape'
+        )
+
+    return {'format': result_format, 'shape': shape, 'max_points': max_points, 'interval': interval}
+
+
+def parse_stream_options(data, query=None):
+    """
+    Read response options for a streamed request.
+
+    Streamed pairs are emitted one at a time, so only the long shape applies.
+
+    Raises:
+        InvalidRequest: If an option has an unsupported value
+    """
+    options = parse_options(data, query)
+    if options['shape'] != 'long':
+        raise InvalidRequest(
+            'Invalid shape',
+            'Streamed responses only support the long shape'
+        )
+    return options
+
+
+def parse_rolling_options(data, query=None):
+    """
+    Read rolling-window options from the request body, falling back to the query string.
+
+    Options:
+        windows: Window sizes in points, a list or comma-separated string
+            (default [20])
+        indicators: Any of "sma", "ema", "std" and "bollinger", a list or
+            comma-separated string (default all)
+        num_std: Bollinger band width in standard deviations (default 2)
+
+    Raises:
+        InvalidRequest: If an option has an unsupported value (400), or
+            there are more than MAX_ROLLING_WINDOWS windows or a window is
+            longer than MAX_RANGE_DAYS (422)
+    """
+    def scalar_option(name, default):
+        value = data.get(name) if isinstance(data, dict) else None
+        if value is None and query is not None:
+            value = query.get(name)
+        return default if value is None else value
+
+    def option(name, default):
+        value = scalar_option(name, None)
+        if value is None:
+            return default
+        if isinstance(value, str):
+            return [part.strip() for part in value.split(',') if part.strip()]
+        return value if isinstance(value, list) else [value]
+
+    windows = []
+    for window in option('windows', [20]):
+        if isinstance(window, str) and window.isdigit():
+            window = int(window)
+        if isinstance(window, bool) or not isinstance(window, numbers.Integral) or window < 2:
+            raise InvalidRequest(
+                'Invalid windows',
+                'windows must be integers of at least 2'
+            )
+        if window > MAX_RANGE_DAYS:
+            raise InvalidRequest(
+                'Window too long',
+                f"Window {window} is longer than the maximum of {MAX_RANGE_DAYS}",
+                status=422
+            )
+        if window not in windows:
+            windows.append(int(window))
+
+    if not windows:
+        raise InvalidRequest('Invalid windows', 'windows must not be empty')
+
+    if len(windows) > MAX_ROLLING_WINDOWS:
+        raise InvalidRequest(
+            'Too many windows',
+            f"The request has {len(windows)} windows; the maximum is {MAX_ROLLING_WINDOWS}",
+            status=422
+        )
+
+    indicators = [str(indicator).lower() for indicator in option('indicators', list(ROLLING_INDICATORS))]
+    unknown = [indicator for indicator in indicators if indicator not in ROLLING_INDICATORS]
+    if unknown or not indicators:
+        raise InvalidRequest(
+            'Invalid indicators',
+            f"indicators must be one or more of: {', '.join(ROLLING_INDICATORS)}"
+        )
+
+    num_std = scalar_option('num_std', 2)
+    if isinstance(num_std, str):
+        try:
+            num_std = float(num_std)
+        except ValueError:
+            pass
+    if isinstance(num_std, bool) or not isinstance(num_std, numbers.Real) or not 0 < num_std < float('inf'):
+        raise InvalidRequest(
+            'Invalid num_std',
+            'num_std must be a positive number'
+        )
+
+    return {
+        'windows': windows,
+        'indicators': [indicator for indicator in ROLLING_INDICATORS if indicator in indicators],
+        'num_std': float(num_std)
+    }
+
+
+def parse_pair(pair, max_points=None, downsample=True):
+    """
+    Validate a single pair object from the request body.
+
+    A max_points field on the pair overrides the request-wide max_points,
+    unless downsample is False, in which case it is ignored.
+
+    Returns:
+        Tuple of (base, target, start_date, end_date, max_points)
+
+    Raises:
+        ValueError: If the pair is missing fields or uses unsupported currencies
+    """
+    base = pair.get('base', '').upper()
+    target = pair.get('target', '').upper()
+    start_date = pair.get('start_date', '')
+    end_date = pair.get('end_date', datetime.now().strftime('%Y-%m-%d'))
+
+    # Validate required fields
+    if not base or not target or not start_date:
+        raise ValueError("Missing required fields: base, target, or start_date")
+
+    # Validate currencies against the list Frankfurter supports
+    supported = currency_registry.codes()
+    if base not in supported or target not in supported:
+        raise ValueError(f"Unsupported currency. Supported: {', '.join(sorted(supported))}")
+
+    if base == target:
+        raise ValueError("Base and target currencies must be different")
+
+    # Validate dates, normalizing them to YYYY-MM-DD
+    try:
+        start = date.fromisoformat(start_date)
+        end = date.fromisoformat(end_date)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+
+    if start > end:
+        raise ValueError("start_date must not be after end_date")
+
+    if downsample and pair.get('max_points') is not None:
+        max_points = parse_max_points(pair['max_points'])
+
+    return base, target, start.isoformat(), end.isoformat(), max_points
+
+
+def parse_pairs(pairs, max_points=None, downsample=True):
+    """
+    Validate every pair in a request body.
+
+    Args:
+        pairs: Pair objects from the request body
+        max_points: Request-wide point limit for pairs that do not set their own
+        downsample: Honour max_points fields on the pairs
+
+    Returns:
+        Tuple of (pair_requests, errors) where pair_requests holds a
+        PairRequest for each valid pair and errors the entries for the rest
+    """
+    pair_requests = []
+    errors = []
+
+    for idx, pair in enumerate(pairs):
+        try:
+            pair_requests.append(PairRequest(idx, pair, *parse_pair(pair, max_points, downsample)))
+        except Exception as e:
+            errors.append(build_pair_error(idx, pair, e))
+
+    return pair_requests, errors
+
+
+def check_limits(pair_requests):
+    """
+    Reject a request whose date ranges are too large to serve.
+
+    Runs on the validated pairs before any cache lookup or upstream call.
+
+    Raises:
+        InvalidRequest: With status 422 if a pair spans more than
+            MAX_RANGE_DAYS or all pairs together span more than
+            MAX_REQUEST_POINTS days
+    """
+    total_days = 0
+    for pair_request in pair_requests:
+        days = (date.fromisoformat(pair_request.end_date) - date.fromisoformat(pair_request.start_date)).days
+        if days > MAX_RANGE_DAYS:
+            raise InvalidRequest(
+                'Date range too long',
+                f"Pair {pair_request.index} spans {days} days; the maximum is {MAX_RANGE_DAYS}",
+                status=422
+            )
+        total_days += days + 1
+
+    if total_days > MAX_REQUEST_POINTS:
+        raise InvalidRequest(
+            'Request too large',
+            f"The pairs span {total_days} days in total; the maximum is {MAX_REQUEST_POINTS}",
+            status=422
+        )
+
+
+def response_series(api_data, base, targets, all_targets=False):
+    """
+    Extract RateSeries from a Frankfurter time series response in one pass.
+
+    Args:
+        api_data: Parsed time series response
+        base: Base currency of the request
+        targets: Targets to return a series for, even if empty
+        all_targets: Also return a series for every other currency present
+
+    Returns:
+        Dict of target currency to RateSeries
+    """
+    columns = {target: ([], []) for target in targets}
+    for date_str, rate_data in api_data.get('rates', {}).items():
+        day = to_ordinal(date_str)
+        for target, rate in rate_data.items():
+            if target not in columns:
+                if not all_targets:
+                    continue
+                columns[target] = ([], [])
+            days, rates = columns[target]
+            days.append(day)
+            rates.append(rate)
+
+    return {
+        target: RateSeries.from_columns(base, target, days, rates)
+        for target, (days, rates) in columns.items()
+    }
+
+
+def build_pair_error(idx, pair, error, upstream_errors=()):
+    """
+    Log a failed pair and build its entry for the "errors" array.
+
+    Args:
+        idx: Position of the pair in the request's "pairs" array
+        pair: Pair object from the request body
+        error: Exception raised while processing the pair
+        upstream_errors: Exception types raised by the HTTP client in use
+    """
+    if isinstance(error, upstream_errors):
+        logger.error(f"API request failed for pair {idx}: {str(error)}")
+        message = f'API request failed: {str(error)}'
+    elif isinstance(error, ValueError):
+        logger.warning(f"Validation error for pair {idx}: {str(error)}")
+        message = str(error)
+    else:
+        logger.error(f"Unexpected error for pair {idx}: {str(error)}")
+        message = f'Unexpected error: {str(error)}'
+
+    return {
+        'index': idx,
+        'pair': pair,
+        'error': message
+    }
+
+
+class RatesBatch:
+    """
+    One /api/rates/multiple request on its way through the pipeline.
+
+    Construction validates the pairs and request limits, serves what it can
+    from the rate cache and plans upstream jobs for the date ranges the
+    cache is missing.
+    The caller runs the jobs however it likes and feeds each outcome back
+    through add_outcome.
+
+    Analytics endpoints pass downsample=False: their statistics need every
+    daily point, so max_points fields on the pairs are ignored.
+    """
+
+    def __init__(self, pairs, options=None, downsample=True):
+        self.pairs = pairs
+        self.options = options or parse_options({})
+
+        # (index, pair_request, series windowed to the pair's own range)
+        self.results = []
+
+        # How many results and errors take_records has already handed out
+        self._taken = (0, 0)
+
+        max_points = self.options['max_points'] if downsample else None
+        pair_requests, self.errors = parse_pairs(pairs, max_points, downsample)
+        check_limits(pair_requests)
+
+        # index -> [pair_request, {leg: series pieces gathered so far}, gaps still outstanding]
+        self._pending = {}
+        gap_requests = []
+
+        # leg -> (base, target) direction it is fetched in by this batch
+        directions = {}
+
+        for pair_request in pair_requests:
+            pieces = {}
+            outstanding = 0
+
+            # Each leg is looked up separately; only the ranges the cache is
+            # missing become gap requests for that leg
+            for leg in pair_legs(pair_request.base, pair_request.target):
+                series, gaps = rate_cache.get_window(
+                    leg[0], leg[1],
+                    pair_request.start_date, pair_request.end_date
+                )
+                pieces[leg] = [series]
+                if not gaps:
+                    continue
+
+                # A leg is fetched in the direction first requested so gaps
+                # keep coalescing by base; its inverse reuses the same fetch.
+                # Derived legs always come from the shared EUR-base fetch
+                requested = (pair_request.base, pair_request.target)
+                fetch_base, fetch_target = directions.setdefault(
+                    leg, requested if not DERIVE_CROSS_RATES and canonical_pair(*requested) == leg else leg
+                )
+                outstanding += len(gaps)
+                gap_requests.extend(
+                    pair_request._replace(base=fetch_base, target=fetch_target, start_date=gap_start, end_date=gap_end)
+                    for gap_start, gap_end in gaps
+                )
+
+            if not outstanding:
+                logger.info(f"Serving {pair_request.base}/{pair_request.target} from cache")
+                self._add_result(pair_request, self._combine(pair_request, pieces))
+                continue
+
+            self._pending[pair_request.index] = [pair_request, pieces, outstanding]
+
+        # Only the missing ranges are fetched; gaps sharing a base with
+        # overlapping windows are coalesced into one job, and cross rates
+        # share one all-currency EUR job per range. Frankfurter answers an
+        # all-currency request about as fast as a single target, so with
+        # PREFETCH_ALL_TARGETS every target of the base is cached too
+        self.jobs = plan_fetches(gap_requests, all_targets=DERIVE_CROSS_RATES or PREFETCH_ALL_TARGETS)
+
+    def _combine(self, pair_request, pieces):
+        legs = {
+            leg: RateSeries.concat(leg[0], leg[1], leg_pieces)
+            for leg, leg_pieces in pieces.items()
+        }
+        return combine_legs(pair_request.base, pair_request.target, legs)
+
+    def _add_result(self, pair_request, series):
+        series = series.window(pair_request.start_date, pair_request.end_date)
+        # Aggregates are built from every daily point, so only daily series are downsampled
+        if pair_request.max_points and self.options['interval'] == 'daily':
+            series = series.downsample(pair_request.max_points)
+        self.results.append((pair_request.index, pair_request, series))
+        return series
+
+    def add_outcome(self, job, outcome, upstream_errors=()):
+        """
+        Merge one job's parsed response (or exception) into the pairs it covers.
+
+        A pair's result is built once every one of its gaps has been
+        fetched; the first failed gap turns the whole pair into an error.
+
+        Args:
+            job: FetchJob that was executed
+            outcome: Parsed Frankfurter response, or the exception raised
+            upstream_errors: Exception types raised by the HTTP client in use
+        """
+        if isinstance(outcome, Exception):
+            for member in job.members:
+                pending = self._pending.pop(member.index, None)
+                if pending is not None:
+                    self.errors.append(build_pair_error(member.index, member.pair, outcome, upstream_errors))
+            return
+
+        # Series are cached and merged in canonical order
+        series_by_target = {
+            target: as_canonical(series)
+            for target, series in response_series(outcome, job.base, job.targets, job.all_targets).items()
+        }
+        for series in series_by_target.values():
+            rate_cache.store_window(job.start_date, job.end_date, series)
+
+        for member in job.members:
+            pending = self._pending.get(member.index)
+            if pending is None:
+                continue
+
+            pair_request, pieces, outstanding = pending
+            pieces[canonical_pair(member.base, member.target)].append(
+                series_by_target[member.target].window(member.start_date, member.end_date)
+            )
+
+            pending[2] = outstanding - 1
+            if pending[2] > 0:
+                continue
+
+            del self._pending[member.index]
+            try:
+                series = self._add_result(pair_request, self._combine(pair_request, pieces))
+                logger.info(f"Successfully fetched {len(series)} rates for {pair_request.base}/{pair_request.target}")
+            except Exception as e:
+                self.errors.append(build_pair_error(member.index, member.pair, e, upstream_errors))
+
+    def is_final(self):
+        """Return True if the response can never change: no errors and only final windows."""
+        return not self.errors and all(
+            is_final(pair_request.end_date) for _, pair_request, _ in self.results
+        )
+
+    def take_records(self):
+        """
+        Return stream records for the pairs completed since the last call.
+
+        Records are {"type": "result", "index", "result"} or
+        {"type": "error", "index", "error"}, in completion order.
+        """
+        taken_results, taken_errors = self._taken
+        self._taken = (len(self.results), len(self.errors))
+
+        records = [
+            {
+                'type': 'result',
+                'index': index,
+                'result': format_result(pair_request, series, self.options['format'], self.options['interval'])
+            }
+            for index, pair_request, series in self.results[taken_results:]
+        ]
+        records.extend(
+            {'type': 'error', 'index': error['index'], 'error': error}
+            for error in self.errors[taken_errors:]
+        )
+        return records
+
+    def summary(self):
+        """Return the closing record of a streamed response."""
+        return {
+            'type': 'summary',
+            'success': len(self.errors) == 0,
+            'total_pairs': len(self.pairs),
+            'successful': len(self.results),
+            'failed': len(self.errors)
+        }
+
+    def response(self, formatter=None):
+        """
+        Build the response body with results and errors in original index order.
+
+        Args:
+            formatter: Optional callable taking the (pair_request, series)
+                entries and returning (results, extra top-level fields);
+                defaults to the format, shape and interval options
+        """
+        self.results.sort(key=lambda item: item[0])
+        self.errors.sort(key=lambda error: error['index'])
+
+        entries = [(pair_request, series) for _, pair_request, series in self.results]
+        if formatter is None:
+            results, extra = format_results(
+                entries, self.options['format'], self.options['shape'], self.options['interval']
+            )
+        else:
+            results, extra = formatter(entries)
+
+        body = build_batch_response(self.pairs, results, self.errors)
+        body.update(extra)
+        return body
+
+
+def build_batch_response(pairs, results, errors):
+    """Build the response body shared by every /api/rates/multiple variant."""
+    return {
+        'success': len(errors) == 0,
+        'results': results,
+        'errors': errors if errors else None,
+        'total_pairs': len(pairs),
+        'successful': len(results),
+        'failed': len(errors)
+    }
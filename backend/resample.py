@@ -0,0 +1,57 @@
+from collections import namedtuple
+
+import numpy as np
+
+from series import EPOCH_ORDINAL
+
+INTERVALS = ('daily', 'weekly', 'monthly')
+
+# Per-bucket aggregates of a series; days holds each bucket's first calendar day
+Aggregates = namedtuple('Aggregates', 'days open high low close mean count')
+
+
+def bucket_starts(days, interval):
+    """
+    Map day ordinals to the ordinal of the first day of their bucket.
+
+    Weeks start on Monday (ordinal 1, 0001-01-01, is a Monday) and months on
+    the 1st.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    if interval == 'weekly':
+        return days - (days - 1) % 7
+    if interval == 'monthly':
+        months = (days - EPOCH_ORDINAL).astype('datetime64[D]').astype('datetime64[M]')
+        return months.astype('datetime64[D]').astype(np.int64) + EPOCH_ORDINAL
+    return days
+
+
+def resample(series, interval):
+    """
+    Aggregate a daily series into open/high/low/close/mean per bucket.
+
+    Days are already sorted, so each bucket is a contiguous run and every
+    aggregate is one ufunc.reduceat over the run boundaries.
+
+    Returns:
+        Aggregates of equal-length arrays, one element per non-empty bucket
+    """
+    starts = bucket_starts(series.days, interval)
+    if not len(starts):
+        empty = np.empty(0)
+        return Aggregates(np.empty(0, dtype=np.int32), empty, empty, empty, empty, empty, np.empty(0, dtype=np.int64))
+
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:], len(starts)] - 1
+    count = last - first + 1
+    rates = series.rates
+
+    return Aggregates(
+        days=starts[first].astype(np.int32),
+        open=rates[first],
+        high=np.maximum.reduceat(rates, first),
+        low=np.minimum.reduceat(rates, first),
+        close=rates[last],
+        mean=np.add.reduceat(rates, first) / count,
+        count=count
+    )
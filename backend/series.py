@@ -0,0 +1,163 @@
+from datetime import date
+
+import numpy as np
+
+from downsample import lttb_indices
+
+# Ordinal of 1970-01-01, used to convert day ordinals to numpy datetime64
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_ordinal(date_str):
+    """Convert a YYYY-MM-DD string to a proleptic Gregorian day ordinal."""
+    return date.fromisoformat(date_str).toordinal()
+
+
+def ordinals_to_datetime64(days):
+    """Convert an array of day ordinals to numpy datetime64[D]."""
+    return (np.asarray(days, dtype=np.int64) - EPOCH_ORDINAL).astype('datetime64[D]')
+
+
+def ordinals_to_strings(days):
+    """Convert an array of day ordinals to a list of YYYY-MM-DD strings."""
+    return np.datetime_as_string(ordinals_to_datetime64(days), unit='D').tolist()
+
+
+# Significant digits kept for derived rates; drops the float noise that
+# reciprocals and divisions of 5-6 digit published rates pick up
+DERIVED_RATE_DIGITS = 10
+
+
+def round_significant(values, digits=DERIVED_RATE_DIGITS):
+    """Round every element of a float array to a number of significant digits."""
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    scale = 10.0 ** (digits - 1 - np.where(np.isfinite(magnitude), magnitude, 0))
+    return np.round(values * scale) / scale
+
+
+class RateSeries:
+    """
+    Columnar daily exchange rate series for one currency pair.
+
+    Dates are stored as int32 day ordinals (date.toordinal()) and rates as
+    float64, both in ascending date order, so windows, merges and
+    serialization work on whole arrays instead of per-point Python objects.
+    """
+
+    __slots__ = ('base', 'target', 'days', 'rates')
+
+    def __init__(self, base, target, days, rates):
+        self.base = base
+        self.target = target
+        self.days = np.asarray(days, dtype=np.int32)
+        self.rates = np.asarray(rates, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.days)
+
+    def __repr__(self):
+        return f"RateSeries({self.base}/{self.target}, {len(self)} points)"
+
+    @classmethod
+    def empty(cls, base, target):
+        return cls(base, target, [], [])
+
+    @classmethod
+    def from_columns(cls, base, target, days, rates):
+        """Build a series from unsorted columns, keeping one point per day."""
+        days = np.asarray(days, dtype=np.int32)
+        rates = np.asarray(rates, dtype=np.float64)
+        days, first = np.unique(days, return_index=True)
+        return cls(base, target, days, rates[first])
+
+    @classmethod
+    def from_mapping(cls, base, target, rates):
+        """Build a series from a {date_str: rate} mapping."""
+        days = [to_ordinal(date_str) for date_str in rates]
+        return cls.from_columns(base, target, days, list(rates.values()))
+
+    @classmethod
+    def concat(cls, base, target, pieces):
+        """Merge series covering different days; earlier pieces win on overlap."""
+        pieces = [piece for piece in pieces if len(piece)]
+        if not pieces:
+            return cls.empty(base, target)
+        if len(pieces) == 1:
+            return cls(base, target, pieces[0].days, pieces[0].rates)
+
+        return cls.from_columns(
+            base, target,
+            np.concatenate([piece.days for piece in pieces]),
+            np.concatenate([piece.rates for piece in pieces])
+        )
+
+    @classmethod
+    def cross(cls, base, target, numerator=None, denominator=None):
+        """
+        Derive base/target from two series quoted against a common currency.
+
+        The rate is numerator (common -> target) divided by denominator
+        (common -> base) on the days both have; a missing side stands for
+        the common currency itself, whose rate is 1.
+        """
+        if numerator is None and denominator is None:
+            return cls.empty(base, target)
+        if denominator is None:
+            return numerator.rounded()
+        if numerator is None:
+            return cls(base, target, denominator.days, round_significant(1.0 / denominator.rates))
+
+        days, top, bottom = np.intersect1d(
+            numerator.days, denominator.days, assume_unique=True, return_indices=True
+        )
+        return cls(base, target, days, round_significant(numerator.rates[top] / denominator.rates[bottom]))
+
+    def inverse(self, digits=DERIVED_RATE_DIGITS):
+        """
+        Return the target/base series, with reciprocal rates rounded to digits.
+
+        With digits=None the reciprocals are kept at full precision, so
+        inverting back and rounding once restores the original rates exactly.
+        """
+        rates = 1.0 / self.rates
+        if digits is not None:
+            rates = round_significant(rates, digits)
+        return RateSeries(self.target, self.base, self.days, rates)
+
+    def rounded(self, digits=DERIVED_RATE_DIGITS):
+        """Return the series with rates rounded to digits; published rates are unchanged."""
+        return RateSeries(self.base, self.target, self.days, round_significant(self.rates, digits))
+
+    def window(self, start_date, end_date):
+        """Return the points between two YYYY-MM-DD dates, inclusive."""
+        lo = np.searchsorted(self.days, to_ordinal(start_date), side='left')
+        hi = np.searchsorted(self.days, to_ordinal(end_date), side='right')
+        return RateSeries(self.base, self.target, self.days[lo:hi], self.rates[lo:hi])
+
+    def downsample(self, max_points):
+        """Return at most max_points points chosen by LTTB to preserve the series' shape."""
+        if len(self) <= max_points:
+            return self
+        keep = lttb_indices(self.days, self.rates, max_points)
+        return RateSeries(self.base, self.target, self.days[keep], self.rates[keep])
+
+    def as_datetime64(self):
+        """Return the dates as a numpy datetime64[D] array."""
+        return ordinals_to_datetime64(self.days)
+
+    def date_strings(self):
+        """Return the dates as a list of YYYY-MM-DD strings."""
+        return ordinals_to_strings(self.days)
+
+    def to_dict(self):
+        """Return the series as a {date_str: rate} mapping."""
+        return dict(zip(self.date_strings(), self.rates.tolist()))
+
+    def to_records(self):
+        """Return the series as a list of {'date', 'rate'} dicts."""
+        return [
+            {'date': date_str, 'rate': rate}
+            for date_str, rate in zip(self.date_strings(), self.rates.tolist())
+        ]
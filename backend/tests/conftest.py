@@ -0,0 +1,120 @@
+import math
+import os
+import sys
+from datetime import date
+
+import pytest
+
+# Keep the suite off the network and the filesystem; set before the backend
+# modules read their configuration at import time
+os.environ['RATE_STORE_PATH'] = ''
+os.environ['CURRENCY_CACHE_PATH'] = ''
+os.environ['UPSTREAM_PREWARM_CONNECTIONS'] = '0'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import crosses  # noqa: E402
+import formats  # noqa: E402
+import rates  # noqa: E402
+import upstream  # noqa: E402
+from compression import compressed_cache  # noqa: E402
+from currencies import FALLBACK_CURRENCIES, currency_registry  # noqa: E402
+from rate_cache import RateCache  # noqa: E402
+
+# EUR reference rates the fake upstream quotes every currency from
+EUR_RATES = {
+    'AUD': 1.65,
+    'CAD': 1.47,
+    'CHF': 0.95,
+    'GBP': 0.86,
+    'JPY': 160.0,
+    'NZD': 1.78,
+    'USD': 1.08,
+}
+
+
+def eur_rate(currency, day):
+    """Deterministic EUR -> currency rate for a YYYY-MM-DD day."""
+    if currency == 'EUR':
+        return 1.0
+    ordinal = date.fromisoformat(day).toordinal()
+    return round(EUR_RATES[currency] * (1 + 0.02 * math.sin(ordinal / 7 + len(currency) * ord(currency[0]))), 6)
+
+
+def cross_rate(base, target, day):
+    return eur_rate(target, day) / eur_rate(base, day)
+
+
+def quote(base, target, day):
+    """The rate the fake upstream publishes for base -> target on a day."""
+    return round(cross_rate(base, target, day), 6)
+
+
+class FakeUpstream:
+    """Stand-in for upstream._get_json answering Frankfurter requests from EUR_RATES."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, url, params=None):
+        params = params or {}
+        self.calls.append((url, dict(params)))
+
+        path = url.rsplit('/', 1)[-1]
+        if path == 'currencies':
+            return dict(FALLBACK_CURRENCIES)
+
+        start, end = (date.fromisoformat(part) for part in path.split('..'))
+        base = params['from']
+        targets = params['to'].split(',') if 'to' in params else [
+            currency for currency in ['EUR', *EUR_RATES] if currency != base
+        ]
+
+        series = {}
+        for ordinal in range(start.toordinal(), end.toordinal() + 1):
+            day = date.fromordinal(ordinal)
+            # Frankfurter has no rates on weekends
+            if day.weekday() >= 5:
+                continue
+            day = day.isoformat()
+            series[day] = {target: quote(base, target, day) for target in targets}
+
+        return {'amount': 1.0, 'base': base, 'start_date': start.isoformat(), 'end_date': end.isoformat(), 'rates': series}
+
+    def windows(self):
+        """Return the (from, start..end) of every time series request made."""
+        return [
+            (params.get('from'), url.rsplit('/', 1)[-1])
+            for url, params in self.calls
+            if '..' in url
+        ]
+
+
+@pytest.fixture
+def fake_upstream(monkeypatch):
+    fake = FakeUpstream()
+    monkeypatch.setattr(upstream, '_get_json', fake)
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch, fake_upstream):
+    """Give every test empty caches and the fallback currency list."""
+    monkeypatch.setattr(rates, 'rate_cache', RateCache())
+    monkeypatch.setattr(currency_registry, 'ttl', float('inf'))
+    currency_registry.refresh()
+    for cache in (formats.result_cache, formats.wide_cache, formats.aggregate_cache, compressed_cache):
+        cache.clear()
+    fake_upstream.calls.clear()
+
+
+@pytest.fixture
+def derive_cross(monkeypatch):
+    monkeypatch.setattr(crosses, 'DERIVE_CROSS_RATES', True)
+    monkeypatch.setattr(rates, 'DERIVE_CROSS_RATES', True)
+
+
+@pytest.fixture
+def client():
+    from app import app
+    return app.test_client()
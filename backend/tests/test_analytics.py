@@ -0,0 +1,104 @@
+import math
+
+import numpy as np
+import pytest
+
+from analytics import correlation_matrix, exponential_mean, rolling_mean, rolling_std
+from downsample import lttb_indices
+
+
+def random_walk(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return 1.3 * np.exp(np.cumsum(rng.normal(0, 0.004, count)))
+
+
+def reference_lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets as originally described, one point at a time."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    # Bucket edges in exact integer arithmetic
+    def edge(bucket):
+        return min(bucket * (n - 2) // (threshold - 2) + 1, n)
+
+    selected = [0]
+    a = 0
+    for bucket in range(threshold - 2):
+        next_start, next_end = edge(bucket + 1), edge(bucket + 2)
+        avg_x = sum(x[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(y[next_start:next_end]) / (next_end - next_start)
+
+        best, best_area = None, -1.0
+        for i in range(edge(bucket), next_start):
+            area = abs((x[a] - avg_x) * (y[i] - y[a]) - (x[a] - x[i]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = i, area
+        selected.append(best)
+        a = best
+
+    selected.append(n - 1)
+    return selected
+
+
+def reference_ema(rates, window):
+    alpha = 2.0 / (window + 1)
+    ema = [rates[0]]
+    for rate in rates[1:]:
+        ema.append(alpha * rate + (1 - alpha) * ema[-1])
+    return [math.nan] * (window - 1) + ema[window - 1:] if len(rates) >= window else [math.nan] * len(rates)
+
+
+@pytest.mark.parametrize('count,threshold', [(10, 3), (100, 7), (731, 50), (731, 200), (1000, 999)])
+def test_lttb_matches_reference(count, threshold):
+    # Irregular day spacing, as with weekends and holidays removed
+    x = np.cumsum(np.random.default_rng(count).integers(1, 4, count)).astype(np.float64)
+    y = random_walk(count, seed=threshold)
+
+    assert lttb_indices(x, y, threshold).tolist() == reference_lttb(x.tolist(), y.tolist(), threshold)
+
+
+def test_lttb_keeps_short_series():
+    assert lttb_indices(np.arange(5), np.ones(5), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize('count,window', [(600, 2), (731, 5), (731, 20), (1000, 200), (10, 20)])
+def test_ema_matches_reference(count, window):
+    rates = random_walk(count, seed=window)
+
+    np.testing.assert_allclose(
+        exponential_mean(rates, window), reference_ema(rates.tolist(), window), rtol=1e-12, equal_nan=True
+    )
+
+
+@pytest.mark.parametrize('window', [2, 20, 200])
+def test_rolling_mean_and_std_match_reference(window):
+    rates = random_walk(731, seed=window)
+    expected_mean = [math.nan] * (window - 1)
+    expected_std = [math.nan] * (window - 1)
+    for end in range(window, len(rates) + 1):
+        expected_mean.append(rates[end - window:end].mean())
+        expected_std.append(rates[end - window:end].std())
+
+    np.testing.assert_allclose(rolling_mean(rates, window), expected_mean, rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(rolling_std(rates, window), expected_std, atol=1e-10, equal_nan=True)
+
+
+def test_correlation_is_pairwise_complete():
+    rng = np.random.default_rng(1)
+    returns = rng.normal(size=(200, 4))
+    returns[:, 1] += returns[:, 0]
+    returns[rng.random(returns.shape) < 0.2] = np.nan
+    returns[:, 3] = 0.5
+
+    correlation, observations = correlation_matrix(returns)
+
+    for i in range(3):
+        for j in range(3):
+            shared = ~np.isnan(returns[:, i]) & ~np.isnan(returns[:, j])
+            assert observations[i, j] == shared.sum()
+            expected = np.corrcoef(returns[shared, i], returns[shared, j])[0, 1]
+            assert correlation[i, j] == pytest.approx(expected, abs=1e-12)
+
+    # A constant column has no defined correlation
+    assert np.isnan(correlation[3]).all()
@@ -0,0 +1,251 @@
+import asyncio
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+import app as flask_app
+import asgi
+from admission import Admission, AsyncAdmission
+from config import MAX_PAIRS_PER_REQUEST
+from conftest import quote
+from series import round_significant
+
+
+def pair(base, target, start_date, end_date):
+    return {'base': base, 'target': target, 'start_date': start_date, 'end_date': end_date}
+
+
+def rates_of(result):
+    return {point['date']: point['rate'] for point in result['data']}
+
+
+def rounded(value):
+    return float(round_significant([value])[0])
+
+
+def fetched(base, target):
+    """Rates of a pair fetched in its own direction: the upstream quotes themselves."""
+    return lambda day: quote(base, target, day)
+
+
+def inverted(base, target):
+    """Rates of a pair served from a fetch in the opposite direction."""
+    return lambda day: rounded(1.0 / quote(target, base, day))
+
+
+def derived(base, target):
+    """Rates of a pair derived from the EUR-base matrix."""
+    def rate(day):
+        top = 1.0 if target == 'EUR' else quote('EUR', target, day)
+        bottom = 1.0 if base == 'EUR' else quote('EUR', base, day)
+        return rounded(top / bottom)
+    return rate
+
+
+def assert_rates(result, expected):
+    assert result['count'] > 0
+    for day, rate in rates_of(result).items():
+        assert rate == expected(day), day
+
+
+def test_fetches_only_missing_ranges(client, fake_upstream):
+    response = client.post('/api/rates/multiple', json={'pairs': [pair('USD', 'CAD', '2024-01-10', '2024-01-20')]})
+    assert response.status_code == 200
+    assert fake_upstream.windows() == [('USD', '2024-01-10..2024-01-20')]
+
+    response = client.post('/api/rates/multiple', json={'pairs': [pair('USD', 'CAD', '2024-01-01', '2024-01-31')]})
+    assert response.status_code == 200
+    assert sorted(fake_upstream.windows()[1:]) == [
+        ('USD', '2024-01-01..2024-01-09'),
+        ('USD', '2024-01-21..2024-01-31'),
+    ]
+
+    result = response.get_json()['results'][0]
+    assert result['count'] == 23
+    assert_rates(result, fetched('USD', 'CAD'))
+
+    # Fully cached now, so nothing more is fetched
+    client.post('/api/rates/multiple', json={'pairs': [pair('USD', 'CAD', '2024-01-05', '2024-01-25')]})
+    assert len(fake_upstream.windows()) == 3
+
+
+def test_pair_and_inverse_share_one_fetch(client, fake_upstream):
+    response = client.post('/api/rates/multiple', json={'pairs': [
+        pair('USD', 'CAD', '2024-03-01', '2024-03-31'),
+        pair('CAD', 'USD', '2024-03-01', '2024-03-31'),
+    ]})
+
+    assert response.status_code == 200
+    assert len(fake_upstream.windows()) == 1
+
+    forward, inverse = response.get_json()['results']
+    assert_rates(forward, fetched('USD', 'CAD'))
+    assert_rates(inverse, inverted('CAD', 'USD'))
+    assert rates_of(forward).keys() == rates_of(inverse).keys()
+
+
+@pytest.mark.parametrize('base,target', [('USD', 'EUR'), ('NZD', 'JPY'), ('USD', 'CAD')])
+def test_non_canonical_pair_keeps_upstream_quotes(client, base, target):
+    body = {'pairs': [pair(base, target, '2023-01-01', '2024-12-31')]}
+
+    # Once fetched, and again served from the canonical cache entry
+    for _ in range(2):
+        result = client.post('/api/rates/multiple', json=body).get_json()['results'][0]
+        assert result['count'] == 522
+        assert_rates(result, fetched(base, target))
+
+    # The opposite direction is one rounded reciprocal of the quotes
+    body = {'pairs': [pair(target, base, '2023-01-01', '2024-12-31')]}
+    assert_rates(client.post('/api/rates/multiple', json=body).get_json()['results'][0], inverted(target, base))
+
+
+def test_derive_cross_fetches_one_eur_matrix(client, fake_upstream, derive_cross):
+    response = client.post('/api/rates/multiple', json={'pairs': [
+        pair('USD', 'CAD', '2024-05-01', '2024-05-31'),
+        pair('GBP', 'JPY', '2024-05-01', '2024-05-31'),
+        pair('EUR', 'AUD', '2024-05-01', '2024-05-31'),
+        pair('CHF', 'EUR', '2024-05-01', '2024-05-31'),
+    ]})
+
+    assert response.status_code == 200
+    assert fake_upstream.calls == [
+        ('https://api.frankfurter.app/2024-05-01..2024-05-31', {'from': 'EUR'})
+    ]
+
+    body = response.get_json()
+    assert body['successful'] == 4
+    for result in body['results']:
+        assert_rates(result, derived(result['base_currency'], result['target_currency']))
+
+    # Every other pair over the range is derived from the cached matrix
+    response = client.post('/api/rates/multiple', json={'pairs': [pair('NZD', 'USD', '2024-05-10', '2024-05-20')]})
+    assert_rates(response.get_json()['results'][0], derived('NZD', 'USD'))
+    assert len(fake_upstream.calls) == 1
+
+
+@pytest.mark.parametrize('path', [
+    '/api/rates/multiple', '/api/rates/stats', '/api/rates/rolling', '/api/rates/correlation',
+])
+def test_asgi_app_matches_flask_app(client, fake_upstream, monkeypatch, path):
+    async def get_json(http_client, url, params):
+        return fake_upstream(url, params)
+
+    monkeypatch.setattr(asgi, '_get_json', get_json)
+    body = {'pairs': [pair('USD', 'CAD', '2024-02-01', '2024-02-29'), pair('CAD', 'USD', '2024-02-10', '2024-02-20')]}
+
+    with TestClient(asgi.app) as async_client:
+        async_response = async_client.post(path, json=body, headers={'Accept-Encoding': 'identity'})
+
+    assert async_response.status_code == 200
+    assert len(fake_upstream.windows()) == 1
+    assert async_response.json() == client.post(path, json=body).get_json()
+
+
+def test_too_many_pairs_is_413(client, fake_upstream):
+    pairs = [pair('USD', 'CAD', '2024-01-01', '2024-01-02')] * (MAX_PAIRS_PER_REQUEST + 1)
+
+    response = client.post('/api/rates/multiple', json={'pairs': pairs})
+
+    assert response.status_code == 413
+    assert not fake_upstream.calls
+
+
+@pytest.mark.parametrize('path,body', [
+    ('/api/rates/multiple', {'pairs': [pair('USD', 'CAD', '2020-01-01', '2024-01-01')]}),
+    ('/api/rates/stats', {'pairs': [pair('USD', 'CAD', '2023-01-01', '2024-12-31')] * 70}),
+    ('/api/rates/rolling', {'pairs': [pair('USD', 'CAD', '2024-01-01', '2024-12-31')], 'windows': list(range(2, 20))}),
+    ('/api/rates/rolling', {'pairs': [pair('USD', 'CAD', '2024-01-01', '2024-12-31')], 'windows': [1000]}),
+])
+def test_over_limits_is_422(client, fake_upstream, path, body):
+    response = client.post(path, json=body)
+
+    assert response.status_code == 422
+    assert response.get_json()['success'] is False
+    assert not fake_upstream.calls
+
+
+def test_no_fetch_slot_is_503(client, fake_upstream, monkeypatch):
+    admission = Admission(limit=1, timeout=0.01)
+    monkeypatch.setattr(flask_app, 'admission', admission)
+    body = {'pairs': [pair('USD', 'CAD', '2024-06-03', '2024-06-07')]}
+
+    with admission.slot():
+        response = client.post('/api/rates/multiple', json=body)
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
+    assert not fake_upstream.calls
+
+    # Cached requests never need a slot
+    client.post('/api/rates/multiple', json=body)
+    with admission.slot():
+        assert client.post('/api/rates/multiple', json=body).status_code == 200
+
+
+@pytest.mark.parametrize('path', ['/api/rates/stats', '/api/rates/rolling', '/api/rates/correlation'])
+def test_analytics_ignore_max_points(client, path):
+    capped = {**pair('USD', 'CAD', '2024-01-01', '2024-03-31'), 'max_points': 3}
+    body = {'pairs': [capped, pair('USD', 'JPY', '2024-01-01', '2024-03-31')], 'max_points': 3}
+
+    results = client.post(path, json=body).get_json()['results']
+
+    assert [result['count'] for result in results] == [65, 65]
+
+
+def test_stream_releases_slot_when_client_disconnects(fake_upstream, monkeypatch):
+    async def get_json(http_client, url, params):
+        return fake_upstream(url, params)
+
+    monkeypatch.setattr(asgi, '_get_json', get_json)
+    body = json.dumps({'pairs': [pair('USD', 'CAD', '2024-04-01', '2024-04-30')]}).encode()
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': 'POST', 'scheme': 'http',
+        'path': '/api/rates/multiple/stream', 'raw_path': b'/api/rates/multiple/stream',
+        'query_string': b'', 'headers': [(b'content-type', b'application/json')],
+        'client': ('test', 1), 'server': ('test', 80),
+    }
+
+    async def disconnect_early():
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+        async def receive():
+            return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+        async def send(message):
+            # Yield like a real server, so the disconnect lands before the body starts
+            await asyncio.sleep(0)
+
+        await asgi.app(scope, receive, send)
+
+    with TestClient(asgi.app) as async_client:
+        admission = AsyncAdmission(limit=1, timeout=0.01)
+        asgi.app.state.admission = admission
+
+        for _ in range(3):
+            async_client.portal.call(disconnect_early)
+
+        # Every slot came back, so a request needing upstream data still gets one
+        response = async_client.post('/api/rates/multiple/stream', content=body.replace(b'04-30', b'05-31'))
+        assert response.status_code == 200
+        assert json.loads(response.text.splitlines()[-1])['type'] == 'summary'
+
+
+@pytest.mark.parametrize('num_std', [[], [2], '', 'wide', 0, True])
+def test_invalid_num_std_is_400(client, fake_upstream, num_std):
+    body = {'pairs': [pair('USD', 'CAD', '2024-01-01', '2024-01-31')], 'num_std': num_std}
+
+    response = client.post('/api/rates/rolling', json=body)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid num_std'
+    assert not fake_upstream.calls
+
+
+def test_num_std_accepts_query_string(client):
+    body = {'pairs': [pair('USD', 'CAD', '2024-01-01', '2024-01-31')]}
+
+    response = client.post('/api/rates/rolling?num_std=1.5', json=body)
+
+    assert response.status_code == 200
+    assert response.get_json()['num_std'] == 1.5
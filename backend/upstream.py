@@ -0,0 +1,159 @@
+from concurrent.futures import Future
+import atexit
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    FRANKFURT_API_URL,
+    UPSTREAM_POOL_SIZE,
+    UPSTREAM_PREWARM_CONNECTIONS,
+    UPSTREAM_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+# Cheap endpoint used to open connections ahead of the first real request
+PREWARM_PATH = '/currencies'
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def _create_session():
+    """Create a keep-alive session with a pooled adapter for Frankfurter."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=UPSTREAM_POOL_SIZE,
+        pool_block=True
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """
+    Return the upstream session for the current worker process.
+
+    The session is created lazily and re-created after a fork, so pooled
+    sockets are never shared between gunicorn workers.
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            _session = _create_session()
+            _session_pid = pid
+            logger.info(f"Created upstream session (pool size {UPSTREAM_POOL_SIZE}) for pid {pid}")
+        return _session
+
+
+def close_session():
+    """Close pooled connections held by the current worker process."""
+    global _session
+
+    with _session_lock:
+        if _session is not None and _session_pid == os.getpid():
+            _session.close()
+        _session = None
+
+
+atexit.register(close_session)
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and receive the same result or exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = Future()
+                self._calls[key] = call
+
+        if not leader:
+            logger.info(f"Joining in-flight upstream request {key}")
+            return call.result()
+
+        try:
+            result = fn(*args)
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+_inflight = SingleFlight()
+
+
+def request_key(url, params=None):
+    """Identify an upstream resource independently of param ordering."""
+    return url, tuple(sorted((params or {}).items()))
+
+
+def _get_json(url, params):
+    response = get_session().get(url, params=params, timeout=UPSTREAM_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_json(url, params=None):
+    """
+    GET a Frankfurter resource through the pooled session.
+
+    Identical requests issued concurrently from other threads share one
+    upstream call. The parsed response is shared between callers and must
+    be treated as read-only.
+
+    Raises:
+        requests.RequestException: On connection errors or non-2xx responses
+    """
+    return _inflight.do(request_key(url, params), _get_json, url, params)
+
+
+def prewarm(connections=UPSTREAM_PREWARM_CONNECTIONS):
+    """
+    Open pooled connections to Frankfurter in the background.
+
+    Issues concurrent lightweight requests so the TCP and TLS handshakes are
+    paid before the first dashboard request arrives. Failures are logged and
+    otherwise ignored.
+    """
+    connections = min(connections, UPSTREAM_POOL_SIZE)
+    if connections <= 0:
+        return
+
+    url = f"{FRANKFURT_API_URL}{PREWARM_PATH}"
+
+    def warm():
+        try:
+            get_session().get(url, timeout=UPSTREAM_TIMEOUT)
+        except requests.RequestException as e:
+            logger.warning(f"Upstream prewarm failed: {str(e)}")
+
+    for _ in range(connections):
+        threading.Thread(target=warm, name='frankfurter-prewarm', daemon=True).start()
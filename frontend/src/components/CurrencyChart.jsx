@@ -45,7 +45,7 @@ import {
   Legend,
 } from 'chart.js';
 import { Line } from 'react-chartjs-2';
-import { CHART_COLORS } from '../utils/constants';
+import { getChartColor } from '../utils/constants';
 import { formatDisplayDate } from '../utils/dateUtils';
 
 // Register chart.js components
@@ -76,7 +76,7 @@ export const CurrencyChart = ({ data, loading = false }) => {
 
     const datasets = currencies.map((currency, index) => {
       const rates = dates.map(date => data.rates[date]?.[currency] || 0);
-      const colorConfig = CHART_COLORS[currency] || CHART_COLORS.USD;
+      const colorConfig = getChartColor(currency, index);
 
       return {
         label: `${data.base_currency || 'Base'}/${currency}`,
@@ -2,8 +2,9 @@
  * CurrencySelector Component
  *
  * Allows users to select a base currency and up to two comparison currencies
- * from a predefined list (EUR, USD, CAD). The first selected currency becomes
- * the base, and subsequent selections become comparisons.
+ * from the currencies the backend supports (see `useCurrencies`). The first
+ * selected currency becomes the base, and subsequent selections become
+ * comparisons.
  *
  * - Clicking the base currency clears all selections.
  * - Clicking a comparison currency deselects it.
@@ -15,8 +16,11 @@
  * @param {boolean} disabled - If true, disables all interaction.
  *
  */
+
+import { useCurrencies } from '../hooks/useCurrencies';
+
 export const CurrencySelector = ({ selectedCurrencies, onChange, disabled }) => {
-  const availableCurrencies = ['EUR', 'USD', 'CAD'];
+  const { currencies: availableCurrencies, names } = useCurrencies();
 
   /**
    * Handles user clicking a currency button.
@@ -93,6 +97,7 @@ export const CurrencySelector = ({ selectedCurrencies, onChange, disabled }) =>
           return (
             <button
               key={currency}
+              title={names[currency]}
               onClick={() => handleCurrencyToggle(currency)}
               disabled={disabled}
               className={`
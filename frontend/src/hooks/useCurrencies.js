@@ -0,0 +1,68 @@
+/**
+ * useCurrencies Hook
+ *
+ * Custom React hook that loads the list of supported currencies from the
+ * backend once per page load, so the selectable currencies follow what the
+ * API actually accepts instead of a hard-coded list.
+ *
+ * Core Features:
+ * - Fetch supported currencies using `fetchCurrencies`
+ * - Share one request between every component using the hook
+ * - Fall back to `FALLBACK_CURRENCIES` while loading or if the request fails
+ *
+ * Returns:
+ * @returns {Object} {
+ *   currencies: string[],               // Supported currency codes, sorted
+ *   names: Object,                      // Mapping of currency code to name
+ *   loading: boolean,                   // Indicates if the fetch is in progress
+ *   error: Error | null                 // Any fetch or API-related error
+ * }
+ *
+ */
+
+import { useState, useEffect } from 'react';
+import { fetchCurrencies } from '../utils/api';
+import { FALLBACK_CURRENCIES } from '../utils/constants';
+
+// The list rarely changes, so one request serves the whole session
+let currenciesPromise = null;
+
+export function useCurrencies() {
+  const [names, setNames] = useState(null);
+  const [loading, setLoading] = useState(true);
+  const [error, setError] = useState(null);
+
+  useEffect(() => {
+    let cancelled = false;
+
+    if (!currenciesPromise) {
+      currenciesPromise = fetchCurrencies().catch((err) => {
+        // Allow a later mount to retry
+        currenciesPromise = null;
+        throw err;
+      });
+    }
+
+    currenciesPromise
+      .then((result) => {
+        if (!cancelled) setNames(result);
+      })
+      .catch((err) => {
+        console.error('[useCurrencies] Error:', err);
+        if (!cancelled) setError(err);
+      })
+      .finally(() => {
+        if (!cancelled) setLoading(false);
+      });
+
+    return () => {
+      cancelled = true;
+    };
+  }, []);
+
+  const currencies = names && Object.keys(names).length > 0
+    ? Object.keys(names).sort()
+    : FALLBACK_CURRENCIES;
+
+  return { currencies, names: names || {}, loading, error };
+}
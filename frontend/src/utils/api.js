@@ -39,6 +39,20 @@ apiClient.interceptors.response.use(
   }
 );
 
+/**
+ * Fetch the currencies supported by the backend
+ * @returns {Promise<Object>} Mapping of currency code to currency name
+ */
+export const fetchCurrencies = async () => {
+  const response = await apiClient.get('/api/currencies');
+
+  if (!response.data.success) {
+    throw new Error('Failed to fetch currencies');
+  }
+
+  return response.data.currencies || {};
+};
+
 /**
  * Fetch currency data for comparison
  * Always uses /api/rates/multiple endpoint for consistency
@@ -73,8 +87,11 @@ export const fetchCompareCurrencyData = async (baseCurrency, compareCurrencies,
 
     console.log('[API] Fetching pairs:', pairs);
 
+    // Ask the backend for the date-major { date: { target: rate } } matrix
+    // directly instead of re-pivoting per-pair arrays on every response
     const response = await apiClient.post('/api/rates/multiple', {
-      pairs: pairs
+      pairs: pairs,
+      shape: 'wide'
     });
 
     console.log('[API] Response:', response.data);
@@ -83,20 +100,7 @@ export const fetchCompareCurrencyData = async (baseCurrency, compareCurrencies,
       throw new Error('Failed to fetch currency pairs');
     }
 
-    const ratesObject = {};
-    
-    response.data.results.forEach((result) => {
-      const targetCurrency = result.target_currency;
-      
-      if (result.data && Array.isArray(result.data)) {
-        result.data.forEach((item) => {
-          if (!ratesObject[item.date]) {
-            ratesObject[item.date] = {};
-          }
-          ratesObject[item.date][targetCurrency] = item.rate;
-        });
-      }
-    });
+    const ratesObject = response.data.rates || {};
 
     console.log('[API] Final rates object:', ratesObject);
 
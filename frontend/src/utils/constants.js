@@ -1,8 +1,6 @@
-export const CURRENCIES = [
-  { value: 'CAD', label: 'Canadian Dollar', color: '#ef4444' },
-  { value: 'USD', label: 'US Dollar', color: '#3b82f6' },
-  { value: 'EUR', label: 'Euro', color: '#10b981' },
-];
+// Shown until the supported list has been loaded from /api/currencies,
+// or if it cannot be loaded
+export const FALLBACK_CURRENCIES = ['EUR', 'USD', 'CAD'];
 
 export const CHART_COLORS = {
   CAD: {
@@ -19,6 +17,27 @@ export const CHART_COLORS = {
   },
 };
 
+// Colours for currencies without an entry in CHART_COLORS, assigned by
+// series index so every line in a chart gets its own colour
+export const CHART_PALETTE = [
+  [245, 158, 11],
+  [139, 92, 246],
+  [236, 72, 153],
+  [20, 184, 166],
+  [249, 115, 22],
+  [99, 102, 241],
+  [132, 204, 22],
+  [6, 182, 212],
+  [168, 85, 247],
+  [234, 179, 8],
+].map(([r, g, b]) => ({
+  border: `rgb(${r}, ${g}, ${b})`,
+  background: `rgba(${r}, ${g}, ${b}, 0.1)`,
+}));
+
+export const getChartColor = (currency, index) =>
+  CHART_COLORS[currency] || CHART_PALETTE[index % CHART_PALETTE.length];
+
 export const MAX_DATE_RANGE_YEARS = 2;
 
 export const STORAGE_KEYS = {